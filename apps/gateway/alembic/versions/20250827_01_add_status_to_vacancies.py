@@ -12,6 +12,9 @@ depends_on = None
 
 
 def upgrade() -> None:
+    # init_db() may already have created the column on a clean start
+    if 'status' in {c['name'] for c in sa.inspect(op.get_bind()).get_columns('vacancies')}:
+        return
     with op.batch_alter_table('vacancies') as batch_op:
         batch_op.add_column(sa.Column('status', sa.String(length=32), nullable=False, server_default='draft'))
 
@@ -1,7 +1,7 @@
 """add details column to vacancies
 
 Revision ID: 20250827_02
-Revises: 20250827_01_add_status_to_vacancies
+Revises: 20250827_01
 Create Date: 2025-08-27
 
 """
@@ -13,12 +13,15 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = '20250827_02'
-down_revision: Union[str, None] = '20250827_01_add_status_to_vacancies'
+down_revision: Union[str, None] = '20250827_01'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
+    # init_db() may already have created the column on a clean start
+    if 'details' in {c['name'] for c in sa.inspect(op.get_bind()).get_columns('vacancies')}:
+        return
     op.add_column('vacancies', sa.Column('details', sa.JSON(), nullable=False, server_default=sa.text("'{}'")))
     # Drop default so application controls the value
     op.alter_column('vacancies', 'details', server_default=None)
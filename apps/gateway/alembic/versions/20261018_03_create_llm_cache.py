@@ -0,0 +1,40 @@
+"""create llm_cache table
+
+Revision ID: 20261018_03
+Revises: 20250827_02
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_03'
+down_revision: Union[str, None] = '20250827_02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # init_db() may already have created the table on a clean start
+    if sa.inspect(op.get_bind()).has_table('llm_cache'):
+        return
+    op.create_table(
+        'llm_cache',
+        sa.Column('key', sa.String(length=64), primary_key=True),
+        sa.Column('method', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(length=128), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_llm_cache_method', 'llm_cache', ['method'])
+    op.create_index('ix_llm_cache_model', 'llm_cache', ['model'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_llm_cache_model', table_name='llm_cache')
+    op.drop_index('ix_llm_cache_method', table_name='llm_cache')
+    op.drop_table('llm_cache')
@@ -0,0 +1,49 @@
+"""create assessment_jobs queue table
+
+Revision ID: 20261018_04
+Revises: 20261018_03
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_04'
+down_revision: Union[str, None] = '20261018_03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # init_db() may already have created the table on a clean start
+    if sa.inspect(op.get_bind()).has_table('assessment_jobs'):
+        return
+    op.create_table(
+        'assessment_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('application_id', sa.Integer(), sa.ForeignKey('applications.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('status', sa.String(length=32), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_assessment_jobs_id', 'assessment_jobs', ['id'])
+    op.create_index('ix_assessment_jobs_application_id', 'assessment_jobs', ['application_id'])
+    # Claim query: runnable jobs ordered by due time
+    op.create_index('ix_assessment_jobs_status_run_after', 'assessment_jobs', ['status', 'run_after'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_assessment_jobs_status_run_after', table_name='assessment_jobs')
+    op.drop_index('ix_assessment_jobs_application_id', table_name='assessment_jobs')
+    op.drop_index('ix_assessment_jobs_id', table_name='assessment_jobs')
+    op.drop_table('assessment_jobs')
@@ -0,0 +1,47 @@
+"""create reassess_runs table
+
+Revision ID: 20261018_05
+Revises: 20261018_04
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_05'
+down_revision: Union[str, None] = '20261018_04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # init_db() may already have created the table on a clean start
+    if sa.inspect(op.get_bind()).has_table('reassess_runs'):
+        return
+    op.create_table(
+        'reassess_runs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('vacancy_id', sa.Integer(), sa.ForeignKey('vacancies.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('requested_by', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('status', sa.String(length=32), nullable=False),
+        sa.Column('concurrency', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('done', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_reassess_runs_id', 'reassess_runs', ['id'])
+    op.create_index('ix_reassess_runs_vacancy_id', 'reassess_runs', ['vacancy_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reassess_runs_vacancy_id', table_name='reassess_runs')
+    op.drop_index('ix_reassess_runs_id', table_name='reassess_runs')
+    op.drop_table('reassess_runs')
@@ -0,0 +1,36 @@
+"""add applications.assessed_by and reassess_runs.llm_skipped
+
+Revision ID: 20261018_06
+Revises: 20261018_05
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_06'
+down_revision: Union[str, None] = '20261018_05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns(table: str) -> set[str]:
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    # init_db() may already have created these on a clean start
+    if 'assessed_by' not in _columns('applications'):
+        op.add_column('applications', sa.Column('assessed_by', sa.String(length=16), nullable=True))
+    if 'llm_skipped' not in _columns('reassess_runs'):
+        op.add_column('reassess_runs', sa.Column('llm_skipped', sa.Integer(), nullable=False, server_default='0'))
+        op.alter_column('reassess_runs', 'llm_skipped', server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column('reassess_runs', 'llm_skipped')
+    op.drop_column('applications', 'assessed_by')
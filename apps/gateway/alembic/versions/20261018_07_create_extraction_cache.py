@@ -0,0 +1,42 @@
+"""create extraction_cache table
+
+Revision ID: 20261018_07
+Revises: 20261018_06
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_07'
+down_revision: Union[str, None] = '20261018_06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # init_db() may already have created the table on a clean start
+    if sa.inspect(op.get_bind()).has_table('extraction_cache'):
+        return
+    op.create_table(
+        'extraction_cache',
+        sa.Column('digest', sa.String(length=64), primary_key=True),
+        sa.Column('kind', sa.String(length=16), primary_key=True),
+        sa.Column('text_version', sa.String(length=64), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('parser_version', sa.String(length=64), nullable=True),
+        sa.Column('parsed', sa.JSON(), nullable=True),
+        sa.Column('size_bytes', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_extraction_cache_last_used_at', 'extraction_cache', ['last_used_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_extraction_cache_last_used_at', table_name='extraction_cache')
+    op.drop_table('extraction_cache')
@@ -0,0 +1,80 @@
+"""indexes for list endpoints, unique application per vacancy and candidate
+
+Revision ID: 20261018_08
+Revises: 20261018_07
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_08'
+down_revision: Union[str, None] = '20261018_07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+    ('ix_vacancies_owner_created', 'vacancies', ['owner_id', 'created_at', 'id']),
+    ('ix_vacancies_status_created', 'vacancies', ['status', 'created_at', 'id']),
+    ('ix_applications_vacancy_created', 'applications', ['vacancy_id', 'created_at', 'id']),
+    ('ix_applications_candidate_created', 'applications', ['candidate_id', 'created_at', 'id']),
+]
+
+# Rows of each (vacancy, candidate) pair ranked two ways: rn=1 is the row to keep (HR scored, then an HR/invite
+# decision past "assessed", then any score; earliest first), score_rn=1 the latest scored row
+_RANKED = """
+SELECT id, vacancy_id, candidate_id, match_score, verdict, notes, assessed_by,
+    row_number() OVER (
+        PARTITION BY vacancy_id, candidate_id
+        ORDER BY
+            CASE WHEN assessed_by = 'hr' THEN 1 ELSE 0 END DESC,
+            CASE status WHEN 'applied' THEN 0 WHEN 'assessed' THEN 1 ELSE 2 END DESC,
+            CASE WHEN match_score IS NOT NULL THEN 1 ELSE 0 END DESC,
+            id
+    ) AS rn,
+    row_number() OVER (
+        PARTITION BY vacancy_id, candidate_id
+        ORDER BY CASE WHEN match_score IS NOT NULL THEN 1 ELSE 0 END DESC, id DESC
+    ) AS score_rn
+FROM applications
+"""
+
+# A kept row without a score (e.g. rejected before assessment) takes the assessment of a duplicate
+MERGE_ASSESSMENT = f"""
+UPDATE applications
+SET match_score = src.match_score, verdict = src.verdict, assessed_by = src.assessed_by,
+    notes = COALESCE(applications.notes, src.notes)
+FROM ({_RANKED}) keep, ({_RANKED}) src
+WHERE applications.id = keep.id AND keep.rn = 1 AND applications.match_score IS NULL
+    AND src.vacancy_id = keep.vacancy_id AND src.candidate_id = keep.candidate_id
+    AND src.score_rn = 1 AND src.match_score IS NOT NULL
+"""
+
+DEDUP_APPLICATIONS = f"DELETE FROM applications WHERE id IN (SELECT id FROM ({_RANKED}) ranked WHERE rn > 1)"
+
+
+def upgrade() -> None:
+    # init_db() may already have created these on a clean start
+    insp = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {ix['name'] for ix in insp.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+    if 'uq_applications_vacancy_candidate' not in {uq['name'] for uq in insp.get_unique_constraints('applications')}:
+        # Duplicates left by the old check-then-insert race: keep the most advanced row of each pair, with
+        # the latest assessment merged in if it has none. The others' jobs go by ON DELETE CASCADE.
+        op.execute(MERGE_ASSESSMENT)
+        op.execute(DEDUP_APPLICATIONS)
+        op.create_unique_constraint('uq_applications_vacancy_candidate', 'applications', ['vacancy_id', 'candidate_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_applications_vacancy_candidate', 'applications', type_='unique')
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,28 @@
+"""add token_version to users
+
+Revision ID: 20261018_09
+Revises: 20261018_08
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_09'
+down_revision: Union[str, None] = '20261018_08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # init_db() may already have created it on a clean start
+    if 'token_version' not in {c['name'] for c in sa.inspect(op.get_bind()).get_columns('users')}:
+        op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
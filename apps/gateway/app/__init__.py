@@ -1 +1,4 @@
+import time
 
+# Gateway startup is timed from the package import, so loading main.py's modules (routers, SDKs, pdfminer) counts
+STARTED_AT = time.perf_counter()
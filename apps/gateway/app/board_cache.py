@@ -0,0 +1,98 @@
+"""
+In-process cache of the serialized public vacancy board (GET /vacancies/public).
+
+Entries are keyed by the query (page, filters) and tagged with a version counter; every change to a vacancy
+in routers/vacancies.py calls invalidate(), which bumps the version. PUBLIC_BOARD_TTL bounds how stale a replica
+can be when another replica changed the data.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, Hashable
+
+from .config import PUBLIC_BOARD_CACHE_ENABLED, PUBLIC_BOARD_CACHE_MAX_ENTRIES, PUBLIC_BOARD_TTL
+
+
+class BoardPage:
+    """A serialized page with its validators."""
+
+    __slots__ = ("version", "expires", "body", "etag", "last_modified", "next_cursor")
+
+    def __init__(self, version: int, expires: float, body: bytes, last_modified: str, next_cursor: str | None):
+        self.version = version
+        self.expires = expires
+        self.body = body
+        # Content hash, so replicas serving the same data hand out the same ETag
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.last_modified = last_modified
+        self.next_cursor = next_cursor
+
+
+class PublicBoardCache:
+    def __init__(self, max_entries: int, ttl: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._pages: OrderedDict[Hashable, BoardPage] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._changed_at = datetime.now(timezone.utc)
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._changed_at = datetime.now(timezone.utc)
+            self._pages.clear()
+            self._stats["invalidations"] += 1
+
+    def get(self, key: Hashable) -> BoardPage | None:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None or page.version != self._version or page.expires < now:
+                self._stats["misses"] += 1
+                return None
+            self._pages.move_to_end(key)
+            self._stats["hits"] += 1
+            return page
+
+    def put(self, key: Hashable, version: int, body: bytes, next_cursor: str | None) -> BoardPage:
+        """
+        Store a page rendered from data read at `version` (read it before querying).
+        A page whose version went stale while it was being rendered is returned but not stored.
+        """
+        with self._lock:
+            page = BoardPage(version, time.monotonic() + self.ttl, body, format_datetime(self._changed_at, usegmt=True), next_cursor)
+            if self.enabled and version == self._version:
+                self._pages[key] = page
+                self._pages.move_to_end(key)
+                while len(self._pages) > self.max_entries:
+                    self._pages.popitem(last=False)
+            return page
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"enabled": self.enabled, "version": self._version, "entries": len(self._pages), **self._stats}
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match check with weak comparison (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+public_board = PublicBoardCache(PUBLIC_BOARD_CACHE_MAX_ENTRIES, PUBLIC_BOARD_TTL, enabled=PUBLIC_BOARD_CACHE_ENABLED)
@@ -20,3 +20,132 @@ POLZA_MODEL = os.getenv("POLZA_MODEL", "openai/gpt-4o")
 
 # Threshold for auto-invite to AI call (0..100)
 INVITE_THRESHOLD = float(os.getenv("INVITE_THRESHOLD", "65"))
+
+# Shared async Polza transport: per-call timeout (seconds) and keep-alive pool bounds
+POLZA_TIMEOUT = float(os.getenv("POLZA_TIMEOUT", "60"))
+POLZA_MAX_CONNECTIONS = int(os.getenv("POLZA_MAX_CONNECTIONS", "200"))
+POLZA_MAX_KEEPALIVE = int(os.getenv("POLZA_MAX_KEEPALIVE", "40"))
+POLZA_KEEPALIVE_EXPIRY = float(os.getenv("POLZA_KEEPALIVE_EXPIRY", "30"))
+
+# LLM result cache: in-process LRU (seconds TTL) + persistent `llm_cache` table shared by replicas
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_PERSISTENT = os.getenv("LLM_CACHE_PERSISTENT", "1") == "1"
+LLM_CACHE_DB_TTL = float(os.getenv("LLM_CACHE_DB_TTL", str(7 * 24 * 3600)))
+
+# Background assessment queue (assessment_jobs table). ASSESS_WORKERS=0 disables in-process workers,
+# e.g. when running `python -m app.jobs` as a separate deployment.
+ASSESS_WORKERS = int(os.getenv("ASSESS_WORKERS", "4"))
+ASSESS_MAX_ATTEMPTS = int(os.getenv("ASSESS_MAX_ATTEMPTS", "5"))
+ASSESS_BACKOFF_BASE = float(os.getenv("ASSESS_BACKOFF_BASE", "10"))
+ASSESS_BACKOFF_MAX = float(os.getenv("ASSESS_BACKOFF_MAX", "600"))
+ASSESS_POLL_INTERVAL = float(os.getenv("ASSESS_POLL_INTERVAL", "1"))
+ASSESS_JOB_LEASE = float(os.getenv("ASSESS_JOB_LEASE", "300"))
+
+# Bulk re-assessment of all applications of a vacancy: in-flight LLM calls per run and rows per commit
+REASSESS_CONCURRENCY = int(os.getenv("REASSESS_CONCURRENCY", "8"))
+REASSESS_MAX_CONCURRENCY = int(os.getenv("REASSESS_MAX_CONCURRENCY", "32"))
+REASSESS_BATCH_SIZE = int(os.getenv("REASSESS_BATCH_SIZE", "100"))
+# A running run whose updated_at (heartbeat) is older than this is treated as dead (process crashed or restarted)
+REASSESS_RUN_LEASE = float(os.getenv("REASSESS_RUN_LEASE", "300"))
+
+# Batched assess prompts: up to ASSESS_BATCH_SIZE candidates share one vacancy context, within a token budget
+ASSESS_BATCH_SIZE = int(os.getenv("ASSESS_BATCH_SIZE", "8"))
+ASSESS_BATCH_TOKEN_BUDGET = int(os.getenv("ASSESS_BATCH_TOKEN_BUDGET", "16000"))
+ASSESS_BATCH_OUTPUT_TOKENS = int(os.getenv("ASSESS_BATCH_OUTPUT_TOKENS", "200"))
+
+# Two-stage screening defaults (overridable per vacancy in details["screening"]); 0 disables
+SCREENING_TOP_K = int(os.getenv("SCREENING_TOP_K", "0"))
+SCREENING_MIN_SCORE = float(os.getenv("SCREENING_MIN_SCORE", "0"))
+
+# Polza resilience: SDK retries, adaptive per-call deadline (p95 * factor within [MIN_TIMEOUT, POLZA_TIMEOUT])
+# and per-method circuit breaker over the last BREAKER_WINDOW calls
+POLZA_MAX_RETRIES = int(os.getenv("POLZA_MAX_RETRIES", "0"))
+POLZA_MIN_TIMEOUT = float(os.getenv("POLZA_MIN_TIMEOUT", "5"))
+POLZA_TIMEOUT_P95_FACTOR = float(os.getenv("POLZA_TIMEOUT_P95_FACTOR", "2.0"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "50"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+
+# Text extraction from uploads runs in a process pool (0 = in a thread, without the CPU limit);
+# documents over the page limit or the per-document CPU seconds are rejected
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "2"))
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "50"))
+EXTRACT_CPU_SECONDS = int(os.getenv("EXTRACT_CPU_SECONDS", "20"))
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "60"))
+
+# Upload extraction cache: text + parsed record per file sha256, LRU-capped to EXTRACT_CACHE_MAX_ENTRIES rows
+EXTRACT_CACHE_ENABLED = os.getenv("EXTRACT_CACHE_ENABLED", "1") == "1"
+EXTRACT_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACT_CACHE_MAX_ENTRIES", "10000"))
+
+# Uploads are streamed to a temp file in UPLOAD_CHUNK_SIZE chunks and rejected (413) past UPLOAD_MAX_BYTES.
+# Multipart request bodies are cut off before parsing at UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD (form framing)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_FORM_OVERHEAD = int(os.getenv("UPLOAD_FORM_OVERHEAD", str(64 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", "")
+
+# Page-parallel PDF extraction for uploads: ranges of EXTRACT_PDF_CHUNK_PAGES pages across the pool,
+# reading at most EXTRACT_PAGE_BUDGET pages / EXTRACT_CHAR_BUDGET characters (0 = no budget)
+EXTRACT_PDF_PARALLEL = os.getenv("EXTRACT_PDF_PARALLEL", "1") == "1"
+EXTRACT_PDF_CHUNK_PAGES = int(os.getenv("EXTRACT_PDF_CHUNK_PAGES", "2"))
+EXTRACT_PAGE_BUDGET = int(os.getenv("EXTRACT_PAGE_BUDGET", "10"))
+EXTRACT_CHAR_BUDGET = int(os.getenv("EXTRACT_CHAR_BUDGET", "40000"))
+
+# Request-path DB access: async engine + AsyncSession (1) or the sync engine in the threadpool (0).
+# Pool bounds apply to both engines; background workers always use the sync one.
+DB_ASYNC = os.getenv("DB_ASYNC", "1") == "1"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+# List endpoints: keyset pages of ?limit= rows (default / max); the next page's cursor is in X-Next-Cursor
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "50"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "200"))
+
+# Public vacancy board: serialized pages cached in-process, dropped on any vacancy change in this process;
+# PUBLIC_BOARD_TTL bounds staleness for changes made through other replicas
+PUBLIC_BOARD_CACHE_ENABLED = os.getenv("PUBLIC_BOARD_CACHE_ENABLED", "1") == "1"
+PUBLIC_BOARD_CACHE_MAX_ENTRIES = int(os.getenv("PUBLIC_BOARD_CACHE_MAX_ENTRIES", "256"))
+PUBLIC_BOARD_TTL = float(os.getenv("PUBLIC_BOARD_TTL", "30"))
+
+# Authenticated users are cached in-process by id for USER_CACHE_TTL seconds (evicted on change in this process)
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "1") == "1"
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+
+# Schema work on gateway startup: migrate (create tables + alembic upgrade, under an advisory lock),
+# verify (only check the alembic revision; run `python -m app.migrate` once per deploy) or skip
+DB_STARTUP = os.getenv("DB_STARTUP", "migrate")
+
+# Password hashing: bcrypt cost (older hashes are rehashed on login), dedicated process pool
+# (0 = threadpool) and the backlog beyond which auth requests get 503
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "32"))
+# /auth/login token buckets: attempts per minute and burst, per client IP and per email. The per-email bucket is
+# the real limit; the per-IP one is a coarse guard against spraying many accounts from one address
+LOGIN_RATE_IP = float(os.getenv("LOGIN_RATE_IP", "60"))
+LOGIN_BURST_IP = int(os.getenv("LOGIN_BURST_IP", "30"))
+# Reverse proxies (IPs or CIDRs, comma-separated) whose X-Forwarded-For is believed when keying per-IP limits;
+# without them every client behind a proxy or Docker's port publishing shares the proxy's address
+TRUSTED_PROXIES = [p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()]
+LOGIN_RATE_EMAIL = float(os.getenv("LOGIN_RATE_EMAIL", "5"))
+LOGIN_BURST_EMAIL = int(os.getenv("LOGIN_BURST_EMAIL", "5"))
+
+# Prometheus exposition at GET /metrics (per worker process) and the per-route HTTP middleware feeding it
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# OpenTelemetry tracing (off by default): spans per route, SQL statement, commit, Polza call and text extraction.
+# TRACING_EXPORTER: otlp (endpoint, headers, sampler from the standard OTEL_* variables), console or memory (tests)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "0") == "1"
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "otlp")
+TRACING_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "hr-gateway")
+
+# Development: count SQL statements and DB time per request (X-DB-Queries / X-DB-Time-Ms headers), warn when a route
+# exceeds its budget (app/query_budget.py) or repeats one statement QUERY_REPEAT_WARN times (N+1); strict mode raises
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "0") == "1"
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "10"))
+QUERY_REPEAT_WARN = int(os.getenv("QUERY_REPEAT_WARN", "5"))
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "0") == "1"
@@ -1,14 +1,32 @@
+from typing import Any, Callable
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 
-from .config import DB_URL
+from .config import DB_URL, DB_ASYNC, DB_POOL_SIZE, DB_MAX_OVERFLOW
+from .metrics import timed_pool
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_engine(DB_URL, pool_pre_ping=True)
+def _pool_kwargs(url: str, poolclass: type = QueuePool, name: str = "sync") -> dict:
+    # sqlite (local runs, benchmarks) uses its own pool classes without size settings
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_pre_ping": True,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        # Checkout wait goes to db_pool_checkout_wait_seconds{engine=name}
+        "poolclass": timed_pool(poolclass, name),
+    }
+
+
+engine = create_engine(DB_URL, **_pool_kwargs(DB_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -17,3 +35,74 @@ def init_db() -> None:
 
     Base.metadata.create_all(bind=engine)
 
+
+# --- Request path: AsyncSession on an async engine (DB_ASYNC=1) or the sync engine behind the same API ---
+def _async_url(url: str) -> str:
+    # postgresql+psycopg picks psycopg's async dialect by itself; sqlite needs the aiosqlite driver
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(_async_url(DB_URL), **_pool_kwargs(DB_URL, AsyncAdaptedQueuePool, "async"))
+    # Objects stay usable after commit without a lazy refresh (which an AsyncSession cannot do implicitly)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+class SyncSessionAdapter:
+    """
+    The subset of the AsyncSession API used by the routers, over a sync Session (DB_ASYNC=0).
+    Each call runs in the threadpool, so handlers are written once for both modes.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, obj: Any) -> None:
+        self.sync_session.add(obj)
+
+    def expunge(self, obj: Any) -> None:
+        self.sync_session.expunge(obj)
+
+    async def execute(self, statement, params=None):
+        return await run_in_threadpool(self.sync_session.execute, statement, params)
+
+    async def scalar(self, statement, params=None):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params)
+
+    async def scalars(self, statement, params=None):
+        return await run_in_threadpool(self.sync_session.scalars, statement, params)
+
+    async def get(self, entity, ident):
+        return await run_in_threadpool(self.sync_session.get, entity, ident)
+
+    async def delete(self, obj: Any) -> None:
+        await run_in_threadpool(self.sync_session.delete, obj)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, obj: Any) -> None:
+        await run_in_threadpool(self.sync_session.refresh, obj)
+
+    async def run_sync(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
+async def dispose_engines() -> None:
+    if async_engine is not None:
+        await async_engine.dispose()
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from ..config import EXTRACT_CACHE_ENABLED, EXTRACT_CACHE_MAX_ENTRIES
+from ..db import SessionLocal
+from ..models import ExtractionCacheEntry
+
+
+log = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """
+    Content-addressed store of upload results, keyed by (sha256 of the file bytes, kind).
+    Keeps the extracted text (valid while text_version matches) and the parsed LLM record
+    (valid while parser_version matches), so a repeat upload skips pdfminer/python-docx and the LLM.
+    About max_entries rows are kept: every evict_every-th write in a process drops the least recently used
+    rows beyond the cap, so the table may overshoot by a few writes between evictions.
+    """
+
+    def __init__(self, max_entries: int, enabled: bool = True, evict_every: int = 100):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.evict_every = max(1, evict_every)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stores = 0
+
+    def _count(self, kind: str, outcome: str) -> None:
+        with self._lock:
+            per = self._stats.setdefault(kind, {"hits_parsed": 0, "hits_text": 0, "misses": 0})
+            per[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            kinds = {k: dict(v) for k, v in self._stats.items()}
+        return {"enabled": self.enabled, "max_entries": self.max_entries, "kinds": kinds}
+
+    def lookup(self, digest: str, kind: str, text_version: str, parser_version: str) -> tuple[str | None, Dict[str, Any] | None]:
+        """(text, parsed) for this file; either is None when missing or produced by another version."""
+        if not self.enabled:
+            return None, None
+        try:
+            with SessionLocal() as db:
+                row = db.get(ExtractionCacheEntry, (digest, kind))
+                if row is None or row.text_version != text_version:
+                    self._count(kind, "misses")
+                    return None, None
+                text = row.text
+                parsed = row.parsed if row.parser_version == parser_version else None
+                row.last_used_at = datetime.utcnow()
+                db.commit()
+        except Exception as e:
+            log.warning("extraction cache lookup failed: %s", e)
+            return None, None
+        self._count(kind, "hits_parsed" if parsed is not None else "hits_text")
+        return text, parsed
+
+    def store(
+        self,
+        digest: str,
+        kind: str,
+        text_version: str,
+        text: str,
+        size_bytes: int,
+        parser_version: str | None = None,
+        parsed: Dict[str, Any] | None = None,
+    ) -> None:
+        if not self.enabled:
+            return
+        now = datetime.utcnow()
+        values = dict(
+            text_version=text_version,
+            text=text,
+            parser_version=parser_version if parsed is not None else None,
+            parsed=parsed,
+            size_bytes=size_bytes,
+            last_used_at=now,
+        )
+        try:
+            with SessionLocal() as db:
+                stmt = insert(ExtractionCacheEntry).values(digest=digest, kind=kind, created_at=now, **values)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[ExtractionCacheEntry.digest, ExtractionCacheEntry.kind],
+                    set_={k: stmt.excluded[k] for k in values},
+                )
+                db.execute(stmt)
+                if self._evict_due():
+                    self._evict(db)
+                db.commit()
+        except Exception as e:
+            log.warning("extraction cache store failed: %s", e)
+
+    def _evict_due(self) -> bool:
+        with self._lock:
+            self._stores += 1
+            return self._stores % self.evict_every == 0
+
+    def _evict(self, db) -> None:
+        # LRU: drop everything older than the max_entries-th most recently used row. The cutoff is read
+        # from the last_used_at index (no row is found while the table is under the cap); no full COUNT
+        cutoff = db.scalar(
+            select(ExtractionCacheEntry.last_used_at)
+            .order_by(ExtractionCacheEntry.last_used_at.desc())
+            .offset(self.max_entries)
+            .limit(1)
+        )
+        if cutoff is not None:
+            db.execute(delete(ExtractionCacheEntry).where(ExtractionCacheEntry.last_used_at <= cutoff))
+
+    def purge(self, kind: str | None = None) -> int:
+        with SessionLocal() as db:
+            stmt = delete(ExtractionCacheEntry)
+            if kind is not None:
+                stmt = stmt.where(ExtractionCacheEntry.kind == kind)
+            removed = db.execute(stmt).rowcount or 0
+            db.commit()
+        return removed
+
+    # DB round-trips are blocking: async callers run them off the event loop
+    async def alookup(self, digest: str, kind: str, text_version: str, parser_version: str) -> tuple[str | None, Dict[str, Any] | None]:
+        if not self.enabled:
+            return None, None
+        return await asyncio.to_thread(self.lookup, digest, kind, text_version, parser_version)
+
+    async def astore(self, *args, **kwargs) -> None:
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self.store, *args, **kwargs)
+
+
+extraction_cache = ExtractionCache(max_entries=EXTRACT_CACHE_MAX_ENTRIES, enabled=EXTRACT_CACHE_ENABLED)
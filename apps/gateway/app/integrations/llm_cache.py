@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+
+from ..config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL,
+    LLM_CACHE_PERSISTENT,
+    LLM_CACHE_DB_TTL,
+)
+from ..db import SessionLocal
+from ..models import LLMCacheEntry
+
+
+log = logging.getLogger(__name__)
+
+
+def _normalize_input(text: str) -> str:
+    # Whitespace-only differences (re-exported PDFs, trailing newlines) must not miss the cache
+    return " ".join((text or "").split())
+
+
+def make_key(method: str, model: str, messages: list[dict]) -> str:
+    """Content address of an LLM call: (method, model, system prompt, normalized input)."""
+    system = "\n".join(m["content"] for m in messages if m.get("role") == "system")
+    user = _normalize_input("\n".join(m["content"] for m in messages if m.get("role") != "system"))
+    payload = json.dumps([method, model, system, user], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier cache of parsed LLM results.
+    Tier 1 is a per-process LRU with TTL; tier 2 is the `llm_cache` table shared by all replicas.
+    Only successfully parsed results are stored; fallbacks and errors are never cached.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, persistent: bool, db_ttl: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persistent = persistent
+        self.db_ttl = db_ttl
+        self.enabled = enabled
+        self._lru: OrderedDict[str, tuple[float, str, str, Dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    # --- stats ---
+    def _count(self, method: str, outcome: str) -> None:
+        with self._lock:
+            per = self._stats.setdefault(method, {"hits_memory": 0, "hits_db": 0, "misses": 0})
+            per[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            methods = {m: dict(v) for m, v in self._stats.items()}
+            size = len(self._lru)
+        totals = {"hits_memory": 0, "hits_db": 0, "misses": 0}
+        for v in methods.values():
+            for k in totals:
+                totals[k] += v[k]
+        return {"enabled": self.enabled, "memory_entries": size, "totals": totals, "methods": methods}
+
+    # --- tier 1 ---
+    def _memory_get(self, key: str) -> Dict[str, Any] | None:
+        with self._lock:
+            item = self._lru.get(key)
+            if item is None:
+                return None
+            expires, _, _, value = item
+            if expires < time.monotonic():
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def _memory_put(self, key: str, method: str, model: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._lru[key] = (time.monotonic() + self.ttl, method, model, copy.deepcopy(value))
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    # --- tier 2 ---
+    def _db_get(self, key: str) -> tuple[str, str, Dict[str, Any]] | None:
+        try:
+            with SessionLocal() as db:
+                row = db.get(LLMCacheEntry, key)
+                if row is None or row.created_at < datetime.utcnow() - timedelta(seconds=self.db_ttl):
+                    return None
+                return row.method, row.model, row.result
+        except Exception as e:
+            log.warning("llm cache lookup failed: %s", e)
+            return None
+
+    def _db_put(self, key: str, method: str, model: str, value: Dict[str, Any]) -> None:
+        try:
+            with SessionLocal() as db:
+                stmt = insert(LLMCacheEntry).values(
+                    key=key, method=method, model=model, result=value, created_at=datetime.utcnow()
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[LLMCacheEntry.key],
+                    set_={"result": stmt.excluded.result, "created_at": stmt.excluded.created_at},
+                )
+                db.execute(stmt)
+                db.commit()
+        except Exception as e:
+            log.warning("llm cache store failed: %s", e)
+
+    # --- public API ---
+    def get(self, key: str, method: str) -> Dict[str, Any] | None:
+        if not self.enabled:
+            return None
+        value = self._memory_get(key)
+        if value is not None:
+            self._count(method, "hits_memory")
+            return value
+        if self.persistent:
+            row = self._db_get(key)
+            if row is not None:
+                _, model, value = row
+                self._memory_put(key, method, model, value)
+                self._count(method, "hits_db")
+                return copy.deepcopy(value)
+        self._count(method, "misses")
+        return None
+
+    def put(self, key: str, method: str, model: str, value: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self._memory_put(key, method, model, value)
+        if self.persistent:
+            self._db_put(key, method, model, value)
+
+    async def aget(self, key: str, method: str) -> Dict[str, Any] | None:
+        if not self.enabled:
+            return None
+        value = self._memory_get(key)
+        if value is not None:
+            self._count(method, "hits_memory")
+            return value
+        if not self.persistent:
+            self._count(method, "misses")
+            return None
+        # Tier 2 is a blocking DB round-trip: keep it off the event loop
+        return await asyncio.to_thread(self.get, key, method)
+
+    async def aput(self, key: str, method: str, model: str, value: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self._memory_put(key, method, model, value)
+        if self.persistent:
+            await asyncio.to_thread(self._db_put, key, method, model, value)
+
+    def purge(self, method: str | None = None, model: str | None = None) -> Dict[str, int]:
+        """Drop entries matching method and/or model (all entries if both are None)."""
+        def match(m: str, mdl: str) -> bool:
+            return (method is None or m == method) and (model is None or mdl == model)
+
+        with self._lock:
+            keys = [k for k, (_, m, mdl, _) in self._lru.items() if match(m, mdl)]
+            for k in keys:
+                del self._lru[k]
+        removed_db = 0
+        if self.persistent:
+            with SessionLocal() as db:
+                stmt = delete(LLMCacheEntry)
+                if method is not None:
+                    stmt = stmt.where(LLMCacheEntry.method == method)
+                if model is not None:
+                    stmt = stmt.where(LLMCacheEntry.model == model)
+                removed_db = db.execute(stmt).rowcount or 0
+                db.commit()
+        return {"memory": len(keys), "db": removed_db}
+
+
+llm_cache = LLMCache(
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    ttl=LLM_CACHE_TTL,
+    persistent=LLM_CACHE_PERSISTENT,
+    db_ttl=LLM_CACHE_DB_TTL,
+    enabled=LLM_CACHE_ENABLED,
+)
@@ -1,11 +1,45 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
+import inspect
 import json
+import logging
+import threading
+import time
+from collections import deque
 from typing import Any, Dict
 
-from openai import OpenAI
+import httpx
+from openai import APIStatusError, AsyncOpenAI, BadRequestError, OpenAI
 
-from ..config import POLZA_API_BASE, POLZA_API_KEY, POLZA_MODEL
+from ..config import (
+    POLZA_API_BASE,
+    POLZA_API_KEY,
+    POLZA_MODEL,
+    POLZA_TIMEOUT,
+    POLZA_MAX_CONNECTIONS,
+    POLZA_MAX_KEEPALIVE,
+    POLZA_KEEPALIVE_EXPIRY,
+    ASSESS_BATCH_SIZE,
+    ASSESS_BATCH_TOKEN_BUDGET,
+    ASSESS_BATCH_OUTPUT_TOKENS,
+    POLZA_MAX_RETRIES,
+    POLZA_MIN_TIMEOUT,
+    POLZA_TIMEOUT_P95_FACTOR,
+    BREAKER_WINDOW,
+    BREAKER_MIN_CALLS,
+    BREAKER_ERROR_RATE,
+    BREAKER_COOLDOWN,
+)
+from ..metrics import POLZA_CALL_SECONDS, POLZA_ERRORS, POLZA_FALLBACKS, POLZA_TOKENS
+from ..tracing import set_attributes, span
+from .llm_cache import llm_cache, make_key
+from .singleflight import single_flight
+
+
+log = logging.getLogger(__name__)
 
 
 class PolzaClient:
@@ -15,197 +49,95 @@ class PolzaClient:
         self.model = model or POLZA_MODEL
         if not self.api_key:
             raise RuntimeError("POLZA_API_KEY is not configured")
-        # OpenAI-compatible client
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        # OpenAI-compatible client; retries are left to the breaker/job queue instead of the SDK
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, timeout=POLZA_TIMEOUT, max_retries=POLZA_MAX_RETRIES)
+
+    def _complete(self, method: str, messages: list[dict], *, temperature: float, max_tokens: int, response_format: bool = True) -> str:
+        with span("polza.completion", **_completion_attrs(self.model, method, messages, max_tokens)) as sp:
+            breaker = breaker_for(method)
+            if not breaker.allow():
+                POLZA_ERRORS.labels(method, "CircuitOpenError").inc()
+                raise CircuitOpenError(f"Polza circuit open for {method}")
+            rf = _wants_response_format(self.model, response_format)
+            set_attributes(sp, **{"polza.response_format": rf, "polza.deadline": breaker.deadline()})
+            start = time.monotonic()
+            try:
+                try:
+                    completion = self.client.chat.completions.create(
+                        **_completion_kwargs(self.model, messages, temperature, max_tokens, rf), timeout=breaker.deadline()
+                    )
+                except BadRequestError as e:
+                    if not rf or not _is_response_format_error(e):
+                        raise
+                    # Provider rejected response_format: retry once without it and remember for this model
+                    completion = self.client.chat.completions.create(
+                        **_completion_kwargs(self.model, messages, temperature, max_tokens, False), timeout=breaker.deadline()
+                    )
+                    _response_format_support[self.model] = False
+                    rf = False
+                    set_attributes(sp, **{"polza.response_format_retry": True})
+            except Exception as e:
+                elapsed = time.monotonic() - start
+                if _is_provider_failure(e):
+                    breaker.record(False, None)
+                else:
+                    breaker.record_rejected()
+                _record_call(method, elapsed, error=e)
+                raise
+            elapsed = time.monotonic() - start
+            breaker.record(True, elapsed)
+            _record_call(method, elapsed, usage=completion.usage, span=sp)
+            if rf:
+                _response_format_support[self.model] = True
+            return completion.choices[0].message.content or "{}"
+
+    def _call_json(self, method: str, messages: list[dict], parse, *, raw: bool = False, **kwargs) -> Dict[str, Any]:
+        # Cached and coalesced: completion -> JSON -> parse. Errors propagate so callers keep their own fallbacks.
+        key = make_key(method, self.model, messages)
+
+        with span(f"polza.{method}", **{"gen_ai.request.model": self.model}) as sp:
+            def call() -> Dict[str, Any]:
+                hit = llm_cache.get(key, method)
+                set_attributes(sp, **{"polza.cache_hit": hit is not None})
+                if hit is not None:
+                    return hit
+                content = self._complete(method, messages, **kwargs)
+                result = parse(content if raw else json.loads(content))
+                llm_cache.put(key, method, self.model, result)
+                return result
+
+            return copy.deepcopy(single_flight.do(key, method, call))
 
     def extract_vacancy(self, raw_text: str) -> Dict[str, Any]:
         """
         Calls an LLM via Polza to extract a normalized vacancy object.
         The output is a JSON object with keys: title, description, seniority, skills, weights.
         """
-        system_prompt = (
-            "Ты помощник HR. Тебе дадут текст вакансии (в любом формате). "
-            "Твоя задача — извлечь и нормализовать поля под нашу схему данных. "
-            "Верни строго JSON без пояснений. Схема: {\n"
-            "  title: string — краткое название вакансии;\n"
-            "  description: string — связное описание (обязанности, условия, требования), объединённое в один текст;\n"
-            "  seniority: string — один из ['Junior','Middle','Senior'] (угадай по тексту, по умолчанию 'Middle');\n"
-            "  skills: string[] — список ключевых навыков (3-12), в нижнем регистре;\n"
-            "  weights: object — веса критериев подбора: { technical: number, communication: number, cases: number } (в сумме ≈1.0).\n"
-            "  details?: object — дополнительные поля если удастся распознать: {\n"
-            "    status?: string, region?: string, city?: string, address?: string,\n"
-            "    employment_type?: string, employment_format?: string, schedule_text?: string,\n"
-            "    income_month_rub?: string, salary_min_rub?: string, salary_max_rub?: string,\n"
-            "    annual_bonus_percent?: string, bonus_type?: string, bonus_desc?: string,\n"
-            "    education_level?: string, experience?: string, travel_required?: string|boolean,\n"
-            "    languages?: string, language_level?: string, extra_info?: string\n"
-            "  }\n"
-            "}"
-        )
-
-        user_prompt = (
-            "Вот содержимое файла с вакансией. Извлеки данные и верни JSON по схеме.\n\n" + raw_text
-        )
-
-        def _call(response_format: bool):
-            kwargs = dict(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=0.2,
-                max_tokens=800,
-            )
-            if response_format:
-                # Some providers may not support response_format; we'll retry without it on failure
-                kwargs["response_format"] = {"type": "json_object"}
-            return self.client.chat.completions.create(**kwargs)
-
         try:
-            completion = _call(response_format=True)
-            content = completion.choices[0].message.content or "{}"
+            # _complete drops response_format once if the provider rejects it (and remembers per model)
+            return self._call_json("extract_vacancy", _extract_vacancy_messages(raw_text), _parse_extracted_vacancy, raw=True, temperature=0.2, max_tokens=800)
         except Exception:
-            try:
-                # Retry without response_format in case the provider doesn't support it
-                completion = _call(response_format=False)
-                content = completion.choices[0].message.content or "{}"
-            except Exception as e:
-                # Fallback to rule-based extractor
-                return self.extract_vacancy_fallback(raw_text)
-        try:
-            data = json.loads(content)
-        except json.JSONDecodeError:
-            # Best-effort fallback: try to find JSON braces
-            start = content.find("{")
-            end = content.rfind("}")
-            if start >= 0 and end > start:
-                data = json.loads(content[start : end + 1])
-            else:
-                raise
-
-        # Normalize defaults
-        title = str(data.get("title") or "Вакансия")
-        description = str(data.get("description") or "")
-        seniority = str(data.get("seniority") or "Middle")
-        skills = data.get("skills") or []
-        if isinstance(skills, str):
-            skills = [s.strip() for s in skills.split(",") if s.strip()]
-        skills = [str(s).strip() for s in skills if str(s).strip()]
-        weights = data.get("weights") or {}
-        technical = float(weights.get("technical") or 0.5)
-        communication = float(weights.get("communication") or 0.3)
-        cases = float(weights.get("cases") or 0.2)
-        # Normalize sum roughly to 1
-        total = technical + communication + cases
-        if total > 0:
-            technical /= total
-            communication /= total
-            cases /= total
-
-        # Normalize casing and acronyms in title/description and skills
-        title = _normalize_title(title)
-        description = _normalize_description(description)
-        skills = [_normalize_skill(s) for s in skills]
-
-        # Pass through details if present
-        details = data.get("details") or {}
-        if isinstance(details, dict):
-            details = _normalize_details(details)
-        else:
-            details = {}
-
-        return {
-            "title": title,
-            "description": description,
-            "seniority": _normalize_seniority(seniority),
-            "skills": skills,
-            "weights": {"technical": technical, "communication": communication, "cases": cases},
-            "details": details,
-        }
+            # Fallback to rule-based extractor (also taken immediately while the breaker is open)
+            POLZA_FALLBACKS.labels("extract_vacancy").inc()
+            return self.extract_vacancy_fallback(raw_text)
 
     def generate_vacancy(self, brief_text: str) -> Dict[str, Any]:
         """
         Given a short brief (title, seniority, bullet highlights), generate a polished vacancy object.
         Output schema is the same as extract_vacancy().
         """
-        system_prompt = (
-            "Ты помощник HR. По короткому брифу нужно сгенерировать полное описание вакансии. "
-            "Верни JSON: { title, description, seniority in ['Junior','Middle','Senior'], skills[3..12] (в нижнем регистре), weights{technical,communication,cases}≈1 }."
-        )
-        user_prompt = (
-            "Бриф вакансии:\n" + brief_text + "\n\nСгенерируй связное, лаконичное описание, объединяя пункты в предложения."
-        )
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=0.4,
-                max_tokens=700,
-                response_format={"type": "json_object"},
-            )
-            content = completion.choices[0].message.content or "{}"
-            data = json.loads(content)
+            return self._call_json("generate_vacancy", _generate_vacancy_messages(brief_text), _parse_generated_vacancy, temperature=0.4, max_tokens=700)
         except Exception:
+            POLZA_FALLBACKS.labels("generate_vacancy").inc()
             return {}
 
-        # Normalize via existing helpers
-        title = _normalize_title(str(data.get("title") or "Вакансия"))
-        description = _normalize_description(str(data.get("description") or ""))
-        seniority = _normalize_seniority(str(data.get("seniority") or "Middle"))
-        skills = data.get("skills") or []
-        if isinstance(skills, str):
-            skills = [s.strip() for s in skills.split(",") if s.strip()]
-        skills = [_normalize_skill(str(s)) for s in skills if str(s).strip()]
-        weights = data.get("weights") or {}
-        technical = float(weights.get("technical") or 0.5)
-        communication = float(weights.get("communication") or 0.3)
-        cases = float(weights.get("cases") or 0.2)
-        total = technical + communication + cases
-        if total > 0:
-            technical /= total; communication /= total; cases /= total
-        return {
-            "title": title,
-            "description": description,
-            "seniority": seniority,
-            "skills": skills,
-            "weights": {"technical": technical, "communication": communication, "cases": cases},
-        }
-
     def extract_profile(self, raw_text: str) -> Dict[str, Any]:
-        system_prompt = (
-            "Ты помощник HR. По тексту резюме извлеки профиль кандидата. Верни JSON: {\n"
-            " summary: string — краткое резюме (3-6 предложений),\n"
-            " skills: string[] — ключевые навыки (6-15) в нижнем регистре,\n"
-            " details: object — поля (если есть): { location, citizenship, work_permit, relocation_ready, travel_ready, desired_position, specializations[], employment_type, schedule, commute_time, experience_years, jobs_text, last_updated }\n"
-            "}"
-        )
-        user_prompt = "Текст резюме:\n\n" + raw_text
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
-                temperature=0.2,
-                max_tokens=900,
-                response_format={"type": "json_object"},
-            )
-            content = completion.choices[0].message.content or "{}"
-            data = json.loads(content)
+            return self._call_json("extract_profile", _extract_profile_messages(raw_text), _parse_extracted_profile, temperature=0.2, max_tokens=900)
         except Exception:
+            POLZA_FALLBACKS.labels("extract_profile").inc()
             return {}
-        # Normalize
-        summary = _normalize_description(str(data.get("summary") or ""))
-        skills = data.get("skills") or []
-        if isinstance(skills, str):
-            skills = [s.strip() for s in skills.split(",") if s.strip()]
-        skills = [str(s).lower().strip() for s in skills if str(s).strip()]
-        details = data.get("details") or {}
-        if not isinstance(details, dict):
-            details = {}
-        return {"summary": summary, "skills": skills, "details": details}
 
     @staticmethod
     def extract_profile_fallback(raw_text: str) -> Dict[str, Any]:
@@ -260,74 +192,55 @@ class PolzaClient:
         return {"summary": _normalize_description(summary), "skills": uniq[:20], "details": details}
 
     def generate_profile(self, brief_text: str) -> Dict[str, Any]:
-        system_prompt = (
-            "Ты помощник HR. Сгенерируй профиль кандидата по краткому брифу. Верни JSON: { summary(3-6 предложений), skills[6..15] (нижний регистр), details{location?, desired_position?, employment_type?, schedule?} }."
-        )
-        user_prompt = "Бриф кандидата:\n" + brief_text
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
-                temperature=0.4,
-                max_tokens=700,
-                response_format={"type": "json_object"},
-            )
-            content = completion.choices[0].message.content or "{}"
-            data = json.loads(content)
+            return self._call_json("generate_profile", _generate_profile_messages(brief_text), _parse_generated_profile, temperature=0.4, max_tokens=700)
         except Exception:
+            POLZA_FALLBACKS.labels("generate_profile").inc()
             return {}
-        summary = _normalize_description(str(data.get("summary") or ""))
-        skills = data.get("skills") or []
-        if isinstance(skills, str):
-            skills = [s.strip() for s in skills.split(",") if s.strip()]
-        details = data.get("details") or {}
-        if not isinstance(details, dict): details = {}
-        return {"summary": summary, "skills": [str(s).lower() for s in skills if str(s).strip()], "details": details}
-
-    def assess_application(self, vacancy: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+
+    def assess_application(self, vacancy: Dict[str, Any], profile: Dict[str, Any], *, fallback: bool = True) -> Dict[str, Any]:
         """
         Use LLM to assess candidate profile fit to the vacancy.
         Returns: { match_score: number (0..100), verdict: 'accept'|'reject'|'neutral', notes: string }
+        With fallback=False LLM errors propagate instead of returning the heuristic assessment.
         """
-        system_prompt = (
-            "Ты помощник-рекрутер. Оцени соответствие профиля кандидата вакансии. "
-            "Верни строго JSON: { match_score: number (0..100), verdict: 'accept'|'reject'|'neutral', notes: string }. "
-            "Оцени по требованиям, ключевым навыкам и релевантному опыту."
-        )
-        vtxt = json.dumps({
-            "title": vacancy.get("title"),
-            "seniority": vacancy.get("seniority"),
-            "skills": vacancy.get("skills"),
-            "weights": vacancy.get("weights"),
-            "description": vacancy.get("description"),
-            "details": vacancy.get("details", {}),
-        }, ensure_ascii=False)
-        ptxt = json.dumps({
-            "summary": profile.get("summary"),
-            "skills": profile.get("skills"),
-            "details": profile.get("details", {}),
-        }, ensure_ascii=False)
-        user_prompt = f"Вакансия:\n{vtxt}\n\nПрофиль кандидата:\n{ptxt}"
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
-                temperature=0.2,
-                max_tokens=400,
-                response_format={"type": "json_object"},
-            )
-            content = completion.choices[0].message.content or "{}"
-            data = json.loads(content)
-            score = float(data.get("match_score") or 0)
-            verdict = str(data.get("verdict") or "neutral")
-            notes = str(data.get("notes") or "")
-            score = max(0.0, min(100.0, score))
-            if verdict not in ("accept", "reject", "neutral"):
-                verdict = "neutral"
-            return {"match_score": score, "verdict": verdict, "notes": notes}
+            messages = _assess_messages(vacancy, profile)
+            return self._call_json("assess_application", messages, _parse_assessment, temperature=0.2, max_tokens=400)
         except Exception:
+            if not fallback:
+                raise
+            POLZA_FALLBACKS.labels("assess_application").inc()
             return self.assess_application_fallback(vacancy, profile)
 
+    def assess_applications_batch(
+        self, vacancy: Dict[str, Any], profiles: list[tuple[int, Dict[str, Any]]], *, fallback: bool = False,
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Assess several candidates of one vacancy, packing them into shared-context prompts
+        (see plan_assess_batches). Returns { application_id: assessment }; entries the model
+        dropped or returned invalid are re-assessed one by one via assess_application().
+        Results are LLM assessments only: candidates the LLM could not assess are left out,
+        unless fallback=True scores them with the heuristic.
+        """
+        with span("polza.assess_applications_batch", **{"gen_ai.request.model": self.model, "polza.candidates": len(profiles)}):
+            results: Dict[int, Dict[str, Any]] = {}
+            for batch in plan_assess_batches(vacancy, profiles):
+                if len(batch) > 1:
+                    try:
+                        content = self._complete("assess_applications_batch", _assess_batch_messages(vacancy, batch), temperature=0.2, max_tokens=_assess_batch_max_tokens(len(batch)))
+                        results.update(_parse_assessment_batch(content, {aid for aid, _ in batch}))
+                    except Exception:
+                        # The batch's candidates are re-assessed one by one below
+                        POLZA_FALLBACKS.labels("assess_applications_batch").inc()
+                for aid, prof in batch:
+                    if aid not in results:
+                        try:
+                            results[aid] = self.assess_application(vacancy, prof, fallback=fallback)
+                        except Exception as e:
+                            log.warning("assess_applications_batch: application %s not assessed: %s", aid, e)
+            return results
+
     @staticmethod
     def assess_application_fallback(vacancy: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
         """Heuristic scoring based on skill overlap and text containment."""
@@ -455,6 +368,642 @@ class PolzaClient:
         }
 
 
+class AsyncPolzaClient:
+    """
+    Async counterpart of PolzaClient. Prompts, parsing and fallbacks are shared;
+    the HTTP transport is a pooled keep-alive httpx client, normally one per process
+    (see open_polza/get_polza below) so requests reuse TCP+TLS connections.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        model: str | None = None,
+        http_client: httpx.AsyncClient | None = None,
+    ):
+        self.api_key = api_key or POLZA_API_KEY
+        self.base_url = base_url or POLZA_API_BASE
+        self.model = model or POLZA_MODEL
+        if not self.api_key:
+            raise RuntimeError("POLZA_API_KEY is not configured")
+        self._owns_http = http_client is None
+        self.http = http_client or _make_async_http()
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=POLZA_TIMEOUT,
+            max_retries=POLZA_MAX_RETRIES,
+            http_client=self.http,
+        )
+
+    async def aclose(self) -> None:
+        if self._owns_http:
+            await self.http.aclose()
+
+    async def _complete(self, method: str, messages: list[dict], *, temperature: float, max_tokens: int, response_format: bool = True) -> str:
+        with span("polza.completion", **_completion_attrs(self.model, method, messages, max_tokens)) as sp:
+            breaker = breaker_for(method)
+            if not breaker.allow():
+                POLZA_ERRORS.labels(method, "CircuitOpenError").inc()
+                raise CircuitOpenError(f"Polza circuit open for {method}")
+            rf = _wants_response_format(self.model, response_format)
+            set_attributes(sp, **{"polza.response_format": rf, "polza.deadline": breaker.deadline()})
+            start = time.monotonic()
+            try:
+                try:
+                    completion = await asyncio.wait_for(
+                        self.client.chat.completions.create(**_completion_kwargs(self.model, messages, temperature, max_tokens, rf)),
+                        timeout=breaker.deadline(),
+                    )
+                except BadRequestError as e:
+                    if not rf or not _is_response_format_error(e):
+                        raise
+                    completion = await asyncio.wait_for(
+                        self.client.chat.completions.create(**_completion_kwargs(self.model, messages, temperature, max_tokens, False)),
+                        timeout=breaker.deadline(),
+                    )
+                    _response_format_support[self.model] = False
+                    rf = False
+                    set_attributes(sp, **{"polza.response_format_retry": True})
+            except Exception as e:
+                elapsed = time.monotonic() - start
+                if _is_provider_failure(e):
+                    breaker.record(False, None)
+                else:
+                    breaker.record_rejected()
+                _record_call(method, elapsed, error=e)
+                raise
+            elapsed = time.monotonic() - start
+            breaker.record(True, elapsed)
+            _record_call(method, elapsed, usage=completion.usage, span=sp)
+            if rf:
+                _response_format_support[self.model] = True
+            return completion.choices[0].message.content or "{}"
+
+    async def _call_json(self, method: str, messages: list[dict], parse, *, raw: bool = False, **kwargs) -> Dict[str, Any]:
+        # Cached and coalesced: completion -> JSON -> parse. Errors propagate so callers keep their own fallbacks.
+        key = make_key(method, self.model, messages)
+
+        with span(f"polza.{method}", **{"gen_ai.request.model": self.model}) as sp:
+            async def call() -> Dict[str, Any]:
+                hit = await llm_cache.aget(key, method)
+                set_attributes(sp, **{"polza.cache_hit": hit is not None})
+                if hit is not None:
+                    return hit
+                content = await self._complete(method, messages, **kwargs)
+                result = parse(content if raw else json.loads(content))
+                await llm_cache.aput(key, method, self.model, result)
+                return result
+
+            return copy.deepcopy(await single_flight.ado(key, method, call))
+
+    async def extract_vacancy(self, raw_text: str, *, fallback: bool = True) -> Dict[str, Any]:
+        # fallback=False lets callers tell an LLM result from the heuristic one (e.g. before caching it)
+        try:
+            return await self._call_json("extract_vacancy", _extract_vacancy_messages(raw_text), _parse_extracted_vacancy, raw=True, temperature=0.2, max_tokens=800)
+        except Exception:
+            if not fallback:
+                raise
+            POLZA_FALLBACKS.labels("extract_vacancy").inc()
+            return PolzaClient.extract_vacancy_fallback(raw_text)
+
+    async def generate_vacancy(self, brief_text: str) -> Dict[str, Any]:
+        try:
+            return await self._call_json("generate_vacancy", _generate_vacancy_messages(brief_text), _parse_generated_vacancy, temperature=0.4, max_tokens=700)
+        except Exception:
+            POLZA_FALLBACKS.labels("generate_vacancy").inc()
+            return {}
+
+    async def extract_profile(self, raw_text: str) -> Dict[str, Any]:
+        try:
+            return await self._call_json("extract_profile", _extract_profile_messages(raw_text), _parse_extracted_profile, temperature=0.2, max_tokens=900)
+        except Exception:
+            POLZA_FALLBACKS.labels("extract_profile").inc()
+            return {}
+
+    async def generate_profile(self, brief_text: str) -> Dict[str, Any]:
+        try:
+            return await self._call_json("generate_profile", _generate_profile_messages(brief_text), _parse_generated_profile, temperature=0.4, max_tokens=700)
+        except Exception:
+            POLZA_FALLBACKS.labels("generate_profile").inc()
+            return {}
+
+    async def assess_application(self, vacancy: Dict[str, Any], profile: Dict[str, Any], *, fallback: bool = True) -> Dict[str, Any]:
+        # fallback=False: errors propagate, so the assessment queue can retry instead of storing the heuristic
+        try:
+            messages = _assess_messages(vacancy, profile)
+            return await self._call_json("assess_application", messages, _parse_assessment, temperature=0.2, max_tokens=400)
+        except Exception:
+            if not fallback:
+                raise
+            POLZA_FALLBACKS.labels("assess_application").inc()
+            return PolzaClient.assess_application_fallback(vacancy, profile)
+
+    async def assess_applications_batch(
+        self,
+        vacancy: Dict[str, Any],
+        profiles: list[tuple[int, Dict[str, Any]]],
+        *,
+        fallback: bool = False,
+        concurrency: int = 1,
+    ) -> Dict[int, Dict[str, Any]]:
+        # Same contract as PolzaClient.assess_applications_batch. Re-assessments of dropped candidates run at most
+        # `concurrency` at a time: a caller that holds one slot of its own limit per batch stays within that limit
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def single(aid: int, prof: Dict[str, Any]) -> Dict[str, Any] | None:
+            async with sem:
+                try:
+                    return await self.assess_application(vacancy, prof, fallback=fallback)
+                except Exception as e:
+                    log.warning("assess_applications_batch: application %s not assessed: %s", aid, e)
+                    return None
+
+        with span("polza.assess_applications_batch", **{"gen_ai.request.model": self.model, "polza.candidates": len(profiles)}):
+            results: Dict[int, Dict[str, Any]] = {}
+            for batch in plan_assess_batches(vacancy, profiles):
+                if len(batch) > 1:
+                    try:
+                        content = await self._complete("assess_applications_batch", _assess_batch_messages(vacancy, batch), temperature=0.2, max_tokens=_assess_batch_max_tokens(len(batch)))
+                        results.update(_parse_assessment_batch(content, {aid for aid, _ in batch}))
+                    except Exception:
+                        # The batch's candidates are re-assessed one by one below
+                        POLZA_FALLBACKS.labels("assess_applications_batch").inc()
+                missing = [(aid, prof) for aid, prof in batch if aid not in results]
+                singles = await asyncio.gather(*(single(aid, prof) for aid, prof in missing))
+                results.update({aid: res for (aid, _), res in zip(missing, singles) if res is not None})
+            return results
+
+
+# --- Circuit breaker, adaptive deadlines and response_format support (process-wide) ---
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Polza while a method's breaker is open; callers take their fallbacks."""
+
+
+class CircuitBreaker:
+    """
+    Per-method health over the last BREAKER_WINDOW calls.
+    closed -> open when the error rate reaches BREAKER_ERROR_RATE (with at least BREAKER_MIN_CALLS
+    samples); open -> half_open after BREAKER_COOLDOWN seconds, letting one probe through;
+    a successful probe closes the breaker, a failed one re-opens it.
+    """
+
+    def __init__(self, method: str):
+        self.method = method
+        self.state = "closed"
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._calls: deque[tuple[bool, float | None]] = deque(maxlen=BREAKER_WINDOW)
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record(self, ok: bool, latency: float | None) -> None:
+        """Count a call in the error rate; latency (None for failed or rejected calls) feeds the p95 deadline."""
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+                if ok:
+                    self.state = "closed"
+                    self._calls.clear()
+                else:
+                    self._open()
+                    return
+            self._calls.append((ok, latency))
+            if self.state == "closed" and len(self._calls) >= BREAKER_MIN_CALLS:
+                errors = sum(1 for c_ok, _ in self._calls if not c_ok)
+                if errors / len(self._calls) >= BREAKER_ERROR_RATE:
+                    self._open()
+
+    def record_rejected(self) -> None:
+        """
+        A client-side 4xx: says nothing about provider health. Counts as a non-error in the window (without a
+        latency for the deadline); a half-open probe that got one is inconclusive, so the next call probes again.
+        """
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+                return
+            self._calls.append((True, None))
+
+    def _open(self) -> None:
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def p95(self) -> float | None:
+        with self._lock:
+            lat = sorted(latency for _, latency in self._calls if latency is not None)
+        if len(lat) < BREAKER_MIN_CALLS:
+            return None
+        return lat[min(len(lat) - 1, int(0.95 * len(lat)))]
+
+    def deadline(self) -> float:
+        """Per-call timeout: observed p95 * POLZA_TIMEOUT_P95_FACTOR, clamped to [POLZA_MIN_TIMEOUT, POLZA_TIMEOUT]."""
+        p95 = self.p95()
+        if p95 is None:
+            return POLZA_TIMEOUT
+        return max(POLZA_MIN_TIMEOUT, min(POLZA_TIMEOUT, p95 * POLZA_TIMEOUT_P95_FACTOR))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self._calls)
+            state = self.state
+        errors = sum(1 for ok, _ in calls if not ok)
+        return {
+            "state": state,
+            "calls": len(calls),
+            "error_rate": round(errors / len(calls), 3) if calls else 0.0,
+            "p95_latency": self.p95(),
+            "deadline": self.deadline(),
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+# model -> whether the provider accepts response_format={"type": "json_object"} for it
+_response_format_support: Dict[str, bool] = {}
+
+
+def breaker_for(method: str) -> CircuitBreaker:
+    with _breakers_lock:
+        b = _breakers.get(method)
+        if b is None:
+            b = _breakers[method] = CircuitBreaker(method)
+        return b
+
+
+def polza_health() -> Dict[str, Any]:
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {
+        "breakers": {m: b.snapshot() for m, b in breakers.items()},
+        "response_format_support": dict(_response_format_support),
+        "single_flight": single_flight.stats(),
+    }
+
+
+def _record_call(method: str, elapsed: float, *, error: Exception | None = None, usage: Any = None, span: Any = None) -> None:
+    POLZA_CALL_SECONDS.labels(method, "error" if error is not None else "ok").observe(elapsed)
+    if error is not None:
+        POLZA_ERRORS.labels(method, type(error).__name__).inc()
+    if usage is not None:
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        POLZA_TOKENS.labels(method, "prompt").inc(prompt_tokens)
+        POLZA_TOKENS.labels(method, "completion").inc(completion_tokens)
+        set_attributes(span, **{"gen_ai.usage.input_tokens": prompt_tokens, "gen_ai.usage.output_tokens": completion_tokens})
+
+
+def _completion_attrs(model: str, method: str, messages: list[dict], max_tokens: int) -> Dict[str, Any]:
+    # gen_ai.* follow the OpenTelemetry GenAI conventions; the prompt size is known before the call, tokens after it
+    return {
+        "gen_ai.system": "polza",
+        "gen_ai.request.model": model,
+        "gen_ai.request.max_tokens": max_tokens,
+        "polza.method": method,
+        "polza.prompt_chars": sum(len(m.get("content") or "") for m in messages),
+        "polza.prompt_messages": len(messages),
+    }
+
+
+def _is_provider_failure(e: Exception) -> bool:
+    # Client-side 4xx (other than 408/429) say nothing about provider health
+    if isinstance(e, APIStatusError):
+        return e.status_code >= 500 or e.status_code in (408, 429)
+    return True
+
+
+def _is_response_format_error(e: BadRequestError) -> bool:
+    # Only a 400 about structured output turns response_format off for the model; other 400s (context length,
+    # bad parameters) are the request's own problem
+    text = " ".join(str(part) for part in (getattr(e, "param", None), getattr(e, "code", None), e.message, e.body) if part)
+    return any(marker in text.lower() for marker in ("response_format", "json_schema", "json_object", "structured output"))
+
+
+def _wants_response_format(model: str, response_format: bool) -> bool:
+    return response_format and _response_format_support.get(model, True)
+
+
+# --- Process-wide async client (opened/closed with the app lifespan) ---
+_shared_client: AsyncPolzaClient | None = None
+
+
+def _make_async_http() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=POLZA_MAX_CONNECTIONS,
+        max_keepalive_connections=POLZA_MAX_KEEPALIVE,
+        keepalive_expiry=POLZA_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=POLZA_TIMEOUT)
+
+
+async def open_polza() -> None:
+    global _shared_client
+    if _shared_client is None and POLZA_API_KEY:
+        _shared_client = AsyncPolzaClient()
+
+
+async def close_polza() -> None:
+    global _shared_client
+    if _shared_client is not None:
+        client, _shared_client = _shared_client, None
+        await client.aclose()
+
+
+def get_polza() -> AsyncPolzaClient:
+    """Shared client for request handlers; raises RuntimeError like PolzaClient() when unconfigured."""
+    if _shared_client is None:
+        if not POLZA_API_KEY:
+            raise RuntimeError("POLZA_API_KEY is not configured")
+        raise RuntimeError("Polza client is not started")
+    return _shared_client
+
+
+# --- Prompt builders and response parsers (shared by sync and async clients) ---
+def _completion_kwargs(model: str, messages: list[dict], temperature: float, max_tokens: int, response_format: bool) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = dict(model=model, messages=messages, temperature=temperature, max_tokens=max_tokens)
+    if response_format:
+        # Some providers may not support response_format; callers retry without it where it matters
+        kwargs["response_format"] = {"type": "json_object"}
+    return kwargs
+
+
+def _messages(system_prompt: str, user_prompt: str) -> list[dict]:
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
+
+
+EXTRACT_VACANCY_PROMPT = (
+    "Ты помощник HR. Тебе дадут текст вакансии (в любом формате). "
+    "Твоя задача — извлечь и нормализовать поля под нашу схему данных. "
+    "Верни строго JSON без пояснений. Схема: {\n"
+    "  title: string — краткое название вакансии;\n"
+    "  description: string — связное описание (обязанности, условия, требования), объединённое в один текст;\n"
+    "  seniority: string — один из ['Junior','Middle','Senior'] (угадай по тексту, по умолчанию 'Middle');\n"
+    "  skills: string[] — список ключевых навыков (3-12), в нижнем регистре;\n"
+    "  weights: object — веса критериев подбора: { technical: number, communication: number, cases: number } (в сумме ≈1.0).\n"
+    "  details?: object — дополнительные поля если удастся распознать: {\n"
+    "    status?: string, region?: string, city?: string, address?: string,\n"
+    "    employment_type?: string, employment_format?: string, schedule_text?: string,\n"
+    "    income_month_rub?: string, salary_min_rub?: string, salary_max_rub?: string,\n"
+    "    annual_bonus_percent?: string, bonus_type?: string, bonus_desc?: string,\n"
+    "    education_level?: string, experience?: string, travel_required?: string|boolean,\n"
+    "    languages?: string, language_level?: string, extra_info?: string\n"
+    "  }\n"
+    "}"
+)
+
+GENERATE_VACANCY_PROMPT = (
+    "Ты помощник HR. По короткому брифу нужно сгенерировать полное описание вакансии. "
+    "Верни JSON: { title, description, seniority in ['Junior','Middle','Senior'], skills[3..12] (в нижнем регистре), weights{technical,communication,cases}≈1 }."
+)
+
+EXTRACT_PROFILE_PROMPT = (
+    "Ты помощник HR. По тексту резюме извлеки профиль кандидата. Верни JSON: {\n"
+    " summary: string — краткое резюме (3-6 предложений),\n"
+    " skills: string[] — ключевые навыки (6-15) в нижнем регистре,\n"
+    " details: object — поля (если есть): { location, citizenship, work_permit, relocation_ready, travel_ready, desired_position, specializations[], employment_type, schedule, commute_time, experience_years, jobs_text, last_updated }\n"
+    "}"
+)
+
+GENERATE_PROFILE_PROMPT = (
+    "Ты помощник HR. Сгенерируй профиль кандидата по краткому брифу. Верни JSON: { summary(3-6 предложений), skills[6..15] (нижний регистр), details{location?, desired_position?, employment_type?, schedule?} }."
+)
+
+ASSESS_PROMPT = (
+    "Ты помощник-рекрутер. Оцени соответствие профиля кандидата вакансии. "
+    "Верни строго JSON: { match_score: number (0..100), verdict: 'accept'|'reject'|'neutral', notes: string }. "
+    "Оцени по требованиям, ключевым навыкам и релевантному опыту."
+)
+
+ASSESS_BATCH_PROMPT = (
+    "Ты помощник-рекрутер. Оцени соответствие каждого профиля кандидата из списка одной и той же вакансии, "
+    "независимо друг от друга. Верни строго JSON: { results: [ { application_id: number, match_score: number (0..100), "
+    "verdict: 'accept'|'reject'|'neutral', notes: string } ] } — ровно по одному элементу на каждого кандидата, "
+    "application_id копируй из входных данных. "
+    "Оцени по требованиям, ключевым навыкам и релевантному опыту."
+)
+
+
+def _extract_vacancy_messages(raw_text: str) -> list[dict]:
+    user_prompt = (
+        "Вот содержимое файла с вакансией. Извлеки данные и верни JSON по схеме.\n\n" + raw_text
+    )
+    return _messages(EXTRACT_VACANCY_PROMPT, user_prompt)
+
+
+def _generate_vacancy_messages(brief_text: str) -> list[dict]:
+    user_prompt = (
+        "Бриф вакансии:\n" + brief_text + "\n\nСгенерируй связное, лаконичное описание, объединяя пункты в предложения."
+    )
+    return _messages(GENERATE_VACANCY_PROMPT, user_prompt)
+
+
+def _extract_profile_messages(raw_text: str) -> list[dict]:
+    return _messages(EXTRACT_PROFILE_PROMPT, "Текст резюме:\n\n" + raw_text)
+
+
+def _generate_profile_messages(brief_text: str) -> list[dict]:
+    return _messages(GENERATE_PROFILE_PROMPT, "Бриф кандидата:\n" + brief_text)
+
+
+def _vacancy_context(vacancy: Dict[str, Any]) -> str:
+    return json.dumps({
+        "title": vacancy.get("title"),
+        "seniority": vacancy.get("seniority"),
+        "skills": vacancy.get("skills"),
+        "weights": vacancy.get("weights"),
+        "description": vacancy.get("description"),
+        "details": vacancy.get("details", {}),
+    }, ensure_ascii=False)
+
+
+def _profile_context(profile: Dict[str, Any]) -> str:
+    return json.dumps({
+        "summary": profile.get("summary"),
+        "skills": profile.get("skills"),
+        "details": profile.get("details", {}),
+    }, ensure_ascii=False)
+
+
+def _assess_messages(vacancy: Dict[str, Any], profile: Dict[str, Any]) -> list[dict]:
+    user_prompt = f"Вакансия:\n{_vacancy_context(vacancy)}\n\nПрофиль кандидата:\n{_profile_context(profile)}"
+    return _messages(ASSESS_PROMPT, user_prompt)
+
+
+def _estimate_tokens(text: str) -> int:
+    # Conservative for Cyrillic-heavy JSON (≈3 chars per token); no tokenizer dependency
+    return len(text) // 3 + 1
+
+
+def plan_assess_batches(
+    vacancy: Dict[str, Any],
+    profiles: list[tuple[int, Dict[str, Any]]],
+    token_budget: int | None = None,
+    max_size: int | None = None,
+) -> list[list[tuple[int, Dict[str, Any]]]]:
+    """
+    Group (application_id, profile) pairs so that the shared vacancy context, every packed profile
+    and the expected per-candidate output stay within token_budget. A profile that alone exceeds
+    the budget gets a batch of one (i.e. a regular single-candidate call).
+    """
+    token_budget = token_budget or ASSESS_BATCH_TOKEN_BUDGET
+    max_size = max(1, max_size or ASSESS_BATCH_SIZE)
+    base = _estimate_tokens(ASSESS_BATCH_PROMPT) + _estimate_tokens(_vacancy_context(vacancy))
+    batches: list[list[tuple[int, Dict[str, Any]]]] = []
+    cur: list[tuple[int, Dict[str, Any]]] = []
+    used = base
+    for aid, prof in profiles:
+        cost = _estimate_tokens(_profile_context(prof)) + ASSESS_BATCH_OUTPUT_TOKENS
+        if cur and (used + cost > token_budget or len(cur) >= max_size):
+            batches.append(cur)
+            cur, used = [], base
+        cur.append((aid, prof))
+        used += cost
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def _assess_batch_max_tokens(n: int) -> int:
+    return ASSESS_BATCH_OUTPUT_TOKENS * n + 100
+
+
+def _assess_batch_messages(vacancy: Dict[str, Any], batch: list[tuple[int, Dict[str, Any]]]) -> list[dict]:
+    candidates = "\n".join(f'{{"application_id": {aid}, "profile": {_profile_context(prof)}}}' for aid, prof in batch)
+    user_prompt = f"Вакансия:\n{_vacancy_context(vacancy)}\n\nКандидаты (по одному JSON на строку):\n{candidates}"
+    return _messages(ASSESS_BATCH_PROMPT, user_prompt)
+
+
+def _parse_assessment_batch(content: str, expected: set[int]) -> Dict[int, Dict[str, Any]]:
+    """De-multiplex a batched answer; unknown, duplicate or score-less entries are dropped."""
+    data = json.loads(content)
+    items = data if isinstance(data, list) else (data.get("results") or [])
+    out: Dict[int, Dict[str, Any]] = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict) or item.get("match_score") is None:
+            continue
+        try:
+            aid = int(item.get("application_id"))
+            if aid in expected and aid not in out:
+                out[aid] = _parse_assessment(item)
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+def _split_skills(skills: Any) -> list:
+    skills = skills or []
+    if isinstance(skills, str):
+        skills = [s.strip() for s in skills.split(",") if s.strip()]
+    return skills
+
+
+def _normalize_weights(weights: Dict[str, Any]) -> Dict[str, float]:
+    technical = float(weights.get("technical") or 0.5)
+    communication = float(weights.get("communication") or 0.3)
+    cases = float(weights.get("cases") or 0.2)
+    # Normalize sum roughly to 1
+    total = technical + communication + cases
+    if total > 0:
+        technical /= total
+        communication /= total
+        cases /= total
+    return {"technical": technical, "communication": communication, "cases": cases}
+
+
+def _parse_extracted_vacancy(content: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        # Best-effort fallback: try to find JSON braces
+        start = content.find("{")
+        end = content.rfind("}")
+        if start >= 0 and end > start:
+            data = json.loads(content[start : end + 1])
+        else:
+            raise
+
+    # Normalize defaults
+    title = str(data.get("title") or "Вакансия")
+    description = str(data.get("description") or "")
+    seniority = str(data.get("seniority") or "Middle")
+    skills = [str(s).strip() for s in _split_skills(data.get("skills")) if str(s).strip()]
+
+    # Normalize casing and acronyms in title/description and skills
+    title = _normalize_title(title)
+    description = _normalize_description(description)
+    skills = [_normalize_skill(s) for s in skills]
+
+    # Pass through details if present
+    details = data.get("details") or {}
+    if isinstance(details, dict):
+        details = _normalize_details(details)
+    else:
+        details = {}
+
+    return {
+        "title": title,
+        "description": description,
+        "seniority": _normalize_seniority(seniority),
+        "skills": skills,
+        "weights": _normalize_weights(data.get("weights") or {}),
+        "details": details,
+    }
+
+
+def _parse_generated_vacancy(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Normalize via existing helpers
+    title = _normalize_title(str(data.get("title") or "Вакансия"))
+    description = _normalize_description(str(data.get("description") or ""))
+    seniority = _normalize_seniority(str(data.get("seniority") or "Middle"))
+    skills = [_normalize_skill(str(s)) for s in _split_skills(data.get("skills")) if str(s).strip()]
+    return {
+        "title": title,
+        "description": description,
+        "seniority": seniority,
+        "skills": skills,
+        "weights": _normalize_weights(data.get("weights") or {}),
+    }
+
+
+def _parse_extracted_profile(data: Dict[str, Any]) -> Dict[str, Any]:
+    summary = _normalize_description(str(data.get("summary") or ""))
+    skills = [str(s).lower().strip() for s in _split_skills(data.get("skills")) if str(s).strip()]
+    details = data.get("details") or {}
+    if not isinstance(details, dict):
+        details = {}
+    return {"summary": summary, "skills": skills, "details": details}
+
+
+def _parse_generated_profile(data: Dict[str, Any]) -> Dict[str, Any]:
+    summary = _normalize_description(str(data.get("summary") or ""))
+    skills = _split_skills(data.get("skills"))
+    details = data.get("details") or {}
+    if not isinstance(details, dict): details = {}
+    return {"summary": summary, "skills": [str(s).lower() for s in skills if str(s).strip()], "details": details}
+
+
+def _parse_assessment(data: Dict[str, Any]) -> Dict[str, Any]:
+    score = float(data.get("match_score") or 0)
+    verdict = str(data.get("verdict") or "neutral")
+    notes = str(data.get("notes") or "")
+    score = max(0.0, min(100.0, score))
+    if verdict not in ("accept", "reject", "neutral"):
+        verdict = "neutral"
+    return {"match_score": score, "verdict": verdict, "notes": notes}
+
+
 # --- Normalization helpers ---
 def _normalize_seniority(val: str) -> str:
     v = (val or "").strip().lower()
@@ -548,3 +1097,31 @@ def _normalize_details(details: Dict[str, Any]) -> Dict[str, Any]:
             continue
         out[k] = sv
     return out
+
+
+# --- Parser versions: change whenever the prompt or the parse/normalize code of an extraction changes ---
+_PARSER_PARTS = {
+    "vacancy": (EXTRACT_VACANCY_PROMPT, _extract_vacancy_messages, _parse_extracted_vacancy),
+    "resume": (EXTRACT_PROFILE_PROMPT, _extract_profile_messages, _parse_extracted_profile),
+}
+_parser_versions: Dict[tuple[str, str], str] = {}
+
+
+def _source_of(part: Any) -> str:
+    if isinstance(part, str):
+        return part
+    try:
+        return inspect.getsource(part)
+    except (OSError, TypeError):
+        return part.__code__.co_code.hex()
+
+
+def parser_version(kind: str, model: str = POLZA_MODEL) -> str:
+    """Digest of the model, the prompt and the parse/_normalize_* sources used to turn text into a `kind` record."""
+    version = _parser_versions.get((kind, model))
+    if version is None:
+        helpers = [fn for name, fn in sorted(globals().items()) if name.startswith(("_normalize_", "_split_skills")) and callable(fn)]
+        parts = [model, *(_source_of(p) for p in _PARSER_PARTS[kind]), *(_source_of(fn) for fn in helpers)]
+        version = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+        _parser_versions[(kind, model)] = version
+    return version
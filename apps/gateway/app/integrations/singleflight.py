@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent LLM calls: while a call for `key` is in flight, further callers
+    with the same key wait for its outcome (result or exception) instead of calling Polza again.
+    Keys are llm_cache.make_key() hashes, so "identical" means same method, model, prompt and input.
+    Sync callers (worker threads) and async callers (event loop) are tracked separately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync: Dict[str, Future] = {}
+        self._async: Dict[str, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, method: str, outcome: str) -> None:
+        with self._lock:
+            per = self._stats.setdefault(method, {"executed": 0, "coalesced": 0})
+            per[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            methods = {m: dict(v) for m, v in self._stats.items()}
+            in_flight = len(self._sync) + len(self._async)
+        totals = {"executed": 0, "coalesced": 0}
+        for v in methods.values():
+            for k in totals:
+                totals[k] += v[k]
+        return {"in_flight": in_flight, "totals": totals, "methods": methods}
+
+    def do(self, key: str, method: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            fut = self._sync.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._sync[key] = Future()
+        if not leader:
+            self._count(method, "coalesced")
+            return fut.result()
+        self._count(method, "executed")
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._sync.pop(key, None)
+
+    async def ado(self, key: str, method: str, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._async.get(key)
+            leader = task is None or task.get_loop() is not loop
+            if leader:
+                # The call runs as its own task so a cancelled caller does not cancel the others
+                task = self._async[key] = loop.create_task(fn())
+                task.add_done_callback(lambda t: self._forget(key, t))
+        self._count(method, "executed" if leader else "coalesced")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._async.get(key) is task:
+                del self._async[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an unawaited failure is not logged as "never retrieved"
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,455 @@
+"""
+Durable assessment queue stored in Postgres (`assessment_jobs`).
+
+POST /applications enqueues a job in the same transaction as the application and returns at once;
+workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number of gateway processes
+(or a standalone `python -m app.jobs`) can drain the queue without double-processing.
+Failures are retried with exponential backoff; when the LLM still fails on the last attempt the heuristic
+score is stored (assessed_by="fallback", never auto-invited), other errors are dead-lettered after max_attempts.
+
+Bulk re-assessment of a whole vacancy (reassess_runs) runs as an in-process task with bounded
+LLM concurrency and one commit per page of applications. The task heartbeats updated_at; a run left
+"running" by a crashed process is failed once REASSESS_RUN_LEASE passes, so the vacancy can be re-run.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from .config import (
+    INVITE_THRESHOLD,
+    ASSESS_WORKERS,
+    ASSESS_MAX_ATTEMPTS,
+    ASSESS_BACKOFF_BASE,
+    ASSESS_BACKOFF_MAX,
+    ASSESS_POLL_INTERVAL,
+    ASSESS_JOB_LEASE,
+    REASSESS_BATCH_SIZE,
+    REASSESS_RUN_LEASE,
+)
+from .db import SessionLocal
+from .metrics import POLZA_FALLBACKS
+from .models import Application, AssessmentJob, ReassessRun, Vacancy
+from .integrations.polza import PolzaClient, get_polza, plan_assess_batches
+from .scoring import (
+    count_screening,
+    prefilter_results,
+    score_applicants,
+    screening_enabled,
+    screening_settings,
+    select_for_llm,
+)
+from .tracing import setup_tracing, shutdown_tracing, span
+
+
+log = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def vacancy_payload(vac: Vacancy) -> Dict[str, Any]:
+    return {"title": vac.title, "description": vac.description, "seniority": vac.seniority, "skills": vac.skills, "weights": vac.weights, "details": getattr(vac, 'details', {})}
+
+
+def assessment_fields(result: Dict[str, Any], assessed_by: str = "llm") -> Dict[str, Any]:
+    """Application columns for an assess_application() result, including the invite decision."""
+    fields = {"match_score": result.get("match_score"), "verdict": result.get("verdict"), "notes": result.get("notes"), "assessed_by": assessed_by}
+    try:
+        score = float(fields["match_score"] or 0)
+    except Exception:
+        score = 0.0
+    # Applicants without an LLM assessment (prefilter, fallback) are not auto-invited on the heuristic alone
+    invite = fields["verdict"] == "accept" and score >= INVITE_THRESHOLD and assessed_by == "llm"
+    fields["status"] = "invited" if invite else "assessed"
+    return fields
+
+
+def apply_assessment(app: Application, result: Dict[str, Any], assessed_by: str = "llm") -> None:
+    """Copy an assess_application() result onto the application and decide on invite."""
+    for k, v in assessment_fields(result, assessed_by).items():
+        setattr(app, k, v)
+
+
+def enqueue_assessment(db: Session, application_id: int) -> AssessmentJob:
+    """Add a job for the application unless one is already pending. Caller commits."""
+    existing = (
+        db.query(AssessmentJob)
+        .filter(AssessmentJob.application_id == application_id, AssessmentJob.status.in_(ACTIVE_STATUSES))
+        .first()
+    )
+    if existing:
+        return existing
+    job = AssessmentJob(application_id=application_id, status="queued", max_attempts=ASSESS_MAX_ATTEMPTS)
+    db.add(job)
+    return job
+
+
+def latest_job(db: Session, application_id: int) -> AssessmentJob | None:
+    return (
+        db.query(AssessmentJob)
+        .filter(AssessmentJob.application_id == application_id)
+        .order_by(AssessmentJob.id.desc())
+        .first()
+    )
+
+
+def backoff_delay(attempts: int) -> float:
+    return min(ASSESS_BACKOFF_MAX, ASSESS_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+
+
+# --- worker side (sync DB helpers run in threads) ---
+def claim_next_job() -> Dict[str, Any] | None:
+    """Lock one runnable job (queued and due, or running with an expired lease) and mark it running."""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        stmt = (
+            select(AssessmentJob)
+            .where(
+                or_(
+                    and_(AssessmentJob.status == "queued", AssessmentJob.run_after <= now),
+                    and_(AssessmentJob.status == "running", AssessmentJob.locked_at < now - timedelta(seconds=ASSESS_JOB_LEASE)),
+                )
+            )
+            .order_by(AssessmentJob.run_after, AssessmentJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = db.execute(stmt).scalars().first()
+        if job is None:
+            return None
+        job.status = "running"
+        job.attempts += 1
+        job.locked_at = now
+        job.updated_at = now
+        if job.attempts > job.max_attempts:
+            # Lease expired on the last attempt: the worker died mid-job too many times
+            _finish(job, "dead", now, job.last_error or "Worker lease expired")
+            db.commit()
+            return None
+        claimed: Dict[str, Any] = {
+            "job_id": job.id, "application_id": job.application_id,
+            "last_attempt": job.attempts >= job.max_attempts,
+        }
+        app = db.get(Application, job.application_id)
+        vac = db.get(Vacancy, app.vacancy_id) if app else None
+        if app is None or vac is None:
+            _finish(job, "dead", now, "Application or vacancy no longer exists")
+            db.commit()
+            return None
+        claimed["vacancy"] = vacancy_payload(vac)
+        claimed["profile"] = app.profile_snapshot or {}
+        db.commit()
+        return claimed
+
+
+def _finish(job: AssessmentJob, status: str, now: datetime, error: str | None = None) -> None:
+    job.status = status
+    job.last_error = error
+    job.locked_at = None
+    job.updated_at = now
+    job.finished_at = now
+
+
+def complete_job(job_id: int, application_id: int, result: Dict[str, Any], assessed_by: str = "llm", error: str | None = None) -> None:
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        app = db.get(Application, application_id)
+        job = db.get(AssessmentJob, job_id)
+        if app is not None:
+            apply_assessment(app, result, assessed_by)
+        if job is not None:
+            _finish(job, "done", now, error)
+        db.commit()
+
+
+def fail_job(job_id: int, error: str) -> None:
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        job = db.get(AssessmentJob, job_id)
+        if job is None:
+            return
+        if job.attempts >= job.max_attempts:
+            _finish(job, "dead", now, error)
+            log.error("assessment job %s dead-lettered after %s attempts: %s", job_id, job.attempts, error)
+        else:
+            job.status = "queued"
+            job.last_error = error
+            job.locked_at = None
+            job.updated_at = now
+            job.run_after = now + timedelta(seconds=backoff_delay(job.attempts))
+            log.warning("assessment job %s attempt %s failed, retrying: %s", job_id, job.attempts, error)
+        db.commit()
+
+
+def requeue_job(db: Session, job: AssessmentJob) -> AssessmentJob:
+    """Put a dead-lettered job back on the queue with a fresh attempt budget. Caller commits."""
+    now = datetime.utcnow()
+    job.status = "queued"
+    job.attempts = 0
+    job.run_after = now
+    job.locked_at = None
+    job.finished_at = None
+    job.updated_at = now
+    return job
+
+
+async def process_job(claimed: Dict[str, Any]) -> None:
+    # Root span per job when tracing: its SQL and Polza spans group under it
+    with span("assessment_job", **{"job.id": claimed["job_id"], "application.id": claimed["application_id"]}):
+        await _process_job(claimed)
+
+
+async def _process_job(claimed: Dict[str, Any]) -> None:
+    try:
+        # Single applications can only be screened by threshold; top-K applies to bulk runs
+        settings = screening_settings(claimed["vacancy"].get("details"))
+        if settings["min_score"] is not None:
+            aid = claimed["application_id"]
+            pre = prefilter_results(claimed["vacancy"], [(aid, claimed["profile"])])[aid]
+            if pre["match_score"] < settings["min_score"]:
+                count_screening(llm_skipped=1)
+                await asyncio.to_thread(complete_job, claimed["job_id"], aid, pre, "prefilter")
+                return
+        client = get_polza()
+        result = await client.assess_application(claimed["vacancy"], claimed["profile"], fallback=False)
+        count_screening(llm_assessed=1)
+        await asyncio.to_thread(complete_job, claimed["job_id"], claimed["application_id"], result)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if not claimed.get("last_attempt"):
+            await asyncio.to_thread(fail_job, claimed["job_id"], error)
+            return
+        # Out of retries: store the heuristic score (not auto-invited) rather than leave the application unscored
+        try:
+            POLZA_FALLBACKS.labels("assess_application").inc()
+            result = PolzaClient.assess_application_fallback(claimed["vacancy"], claimed["profile"])
+            await asyncio.to_thread(complete_job, claimed["job_id"], claimed["application_id"], result, "fallback", error)
+            log.error("assessment job %s: LLM failed on the last attempt, stored the heuristic score: %s", claimed["job_id"], error)
+        except Exception as e2:
+            await asyncio.to_thread(fail_job, claimed["job_id"], f"{error}; fallback: {type(e2).__name__}: {e2}")
+
+
+class AssessmentWorkerPool:
+    """N asyncio workers polling the queue; LLM calls are awaited, DB work runs in threads."""
+
+    def __init__(self, size: int = ASSESS_WORKERS, poll_interval: float = ASSESS_POLL_INTERVAL):
+        self.size = size
+        self.poll_interval = poll_interval
+        self._stop = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._stop.clear()
+        self._tasks = [asyncio.create_task(self._run(n)) for n in range(self.size)]
+
+    async def stop(self) -> None:
+        self._stop.set()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, n: int) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = await asyncio.to_thread(claim_next_job)
+            except Exception as e:
+                log.warning("assessment worker %s: claim failed: %s", n, e)
+                claimed = None
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await process_job(claimed)
+
+
+# --- bulk re-assessment of one vacancy (POST /vacancies/{id}/reassess) ---
+def expire_stale_run(run: ReassessRun) -> bool:
+    """Mark a running run failed if its task stopped heartbeating (process crash or restart). Caller commits."""
+    now = datetime.utcnow()
+    if run.status != "running" or run.updated_at >= now - timedelta(seconds=REASSESS_RUN_LEASE):
+        return False
+    run.status = "failed"
+    run.last_error = "Run lease expired: the process running it stopped"
+    run.updated_at = now
+    run.finished_at = now
+    return True
+
+
+def start_reassess_run(db: Session, vacancy_id: int, user_id: int, concurrency: int) -> ReassessRun:
+    """Create a run, or return the one already in progress for this vacancy. Caller commits."""
+    active = db.query(ReassessRun).filter(ReassessRun.vacancy_id == vacancy_id, ReassessRun.status == "running").first()
+    if active and not expire_stale_run(active):
+        return active
+    total = db.query(func.count(Application.id)).filter(Application.vacancy_id == vacancy_id).scalar() or 0
+    run = ReassessRun(vacancy_id=vacancy_id, requested_by=user_id, status="running", concurrency=concurrency, total=total)
+    db.add(run)
+    return run
+
+
+def _load_vacancy(vacancy_id: int) -> Dict[str, Any] | None:
+    with SessionLocal() as db:
+        vac = db.get(Vacancy, vacancy_id)
+        return vacancy_payload(vac) if vac else None
+
+
+def _load_page(vacancy_id: int, after_id: int, limit: int) -> list[tuple[int, Dict[str, Any]]]:
+    # Keyset page over the vacancy's applications; the connection is released before any LLM call
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Application.id, Application.profile_snapshot)
+            .where(Application.vacancy_id == vacancy_id, Application.id > after_id)
+            .order_by(Application.id)
+            .limit(limit)
+        ).all()
+        return [(r.id, r.profile_snapshot or {}) for r in rows]
+
+
+def _commit_batch(run_id: int, results: list[tuple[int, Dict[str, Any] | None, str]]) -> None:
+    rows = [{"id": app_id, **assessment_fields(res, source)} for app_id, res, source in results if res is not None]
+    failed = sum(1 for _, res, _ in results if res is None)
+    skipped = sum(1 for _, res, source in results if res is not None and source == "prefilter")
+    with SessionLocal() as db:
+        if rows:
+            db.execute(update(Application), rows)
+        db.execute(
+            update(ReassessRun)
+            .where(ReassessRun.id == run_id)
+            .values(
+                done=ReassessRun.done + len(rows),
+                failed=ReassessRun.failed + failed,
+                llm_skipped=ReassessRun.llm_skipped + skipped,
+                updated_at=datetime.utcnow(),
+            )
+        )
+        db.commit()
+
+
+def _touch_run(run_id: int) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(ReassessRun)
+            .where(ReassessRun.id == run_id, ReassessRun.status == "running")
+            .values(updated_at=datetime.utcnow())
+        )
+        db.commit()
+
+
+async def _heartbeat(run_id: int) -> None:
+    # Pages can take longer than the lease (slow LLM batches), so liveness does not depend on commits
+    while True:
+        await asyncio.sleep(REASSESS_RUN_LEASE / 3)
+        try:
+            await asyncio.to_thread(_touch_run, run_id)
+        except Exception as e:
+            log.warning("reassess run %s: heartbeat failed: %s", run_id, e)
+
+
+def _finish_run(run_id: int, status: str, error: str | None = None) -> None:
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.execute(
+            update(ReassessRun)
+            .where(ReassessRun.id == run_id)
+            .values(status=status, last_error=error, updated_at=now, finished_at=now)
+        )
+        db.commit()
+
+
+async def _prefilter_pass(vacancy_id: int, vac: Dict[str, Any], batch_size: int, settings: Dict[str, Any]) -> set[int]:
+    # Scores are per-applicant, so pages can be scored independently and ranked globally afterwards
+    scored: list[tuple[int, float]] = []
+    after_id = 0
+    while True:
+        page = await asyncio.to_thread(_load_page, vacancy_id, after_id, batch_size)
+        if not page:
+            break
+        after_id = page[-1][0]
+        scores = score_applicants(vac, [prof for _, prof in page])
+        scored.extend((aid, float(s)) for (aid, _), s in zip(page, scores))
+    return select_for_llm(scored, settings["top_k"], settings["min_score"])
+
+
+async def run_reassess(run_id: int, vacancy_id: int, concurrency: int, batch_size: int = REASSESS_BATCH_SIZE) -> None:
+    """
+    Re-score every application of the vacancy. Each page is packed into multi-candidate prompts
+    (plan_assess_batches); at most `concurrency` batches are in flight. DB connections are held
+    only to read a page and to write its scores in one commit.
+
+    With two-stage screening configured for the vacancy, a first pass scores everyone with the
+    vectorized heuristic and only the selected top-K / above-threshold applicants reach the LLM.
+    """
+    heartbeat = asyncio.create_task(_heartbeat(run_id))
+    try:
+        client = get_polza()
+        vac = await asyncio.to_thread(_load_vacancy, vacancy_id)
+        if vac is None:
+            raise RuntimeError("Vacancy no longer exists")
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(batch: list[tuple[int, Dict[str, Any]]]) -> list[tuple[int, Dict[str, Any] | None, str]]:
+            # LLM results only: applications the LLM could not assess come back as None and count as failed
+            # (their previous score stays), never as heuristic scores tagged "llm" that could auto-invite
+            async with sem:
+                try:
+                    scored = await client.assess_applications_batch(vac, batch, fallback=False)
+                except Exception as e:
+                    log.warning("reassess run %s: batch of %s failed: %s", run_id, len(batch), e)
+                    scored = {}
+                return [(app_id, scored.get(app_id), "llm") for app_id, _ in batch]
+
+        settings = screening_settings(vac.get("details"))
+        selected: set[int] | None = None
+        if screening_enabled(settings):
+            selected = await _prefilter_pass(vacancy_id, vac, batch_size, settings)
+
+        after_id = 0
+        while True:
+            page = await asyncio.to_thread(_load_page, vacancy_id, after_id, batch_size)
+            if not page:
+                break
+            after_id = page[-1][0]
+            to_llm = [item for item in page if selected is None or item[0] in selected]
+            rest = [item for item in page if selected is not None and item[0] not in selected]
+            pre = prefilter_results(vac, rest) if rest else {}
+            results = await asyncio.gather(*(one(batch) for batch in plan_assess_batches(vac, to_llm)))
+            rows = [r for batch in results for r in batch] + [(aid, res, "prefilter") for aid, res in pre.items()]
+            count_screening(llm_assessed=sum(1 for _, res, source in rows if res is not None and source == "llm"), llm_skipped=len(pre))
+            await asyncio.to_thread(_commit_batch, run_id, rows)
+        await asyncio.to_thread(_finish_run, run_id, "done")
+    except Exception as e:
+        log.error("reassess run %s failed: %s", run_id, e)
+        await asyncio.to_thread(_finish_run, run_id, "failed", f"{type(e).__name__}: {e}")
+    finally:
+        heartbeat.cancel()
+
+
+worker_pool = AssessmentWorkerPool()
+
+
+async def _main() -> None:
+    from .integrations.polza import open_polza, close_polza
+
+    setup_tracing()
+    await open_polza()
+    pool = AssessmentWorkerPool(size=max(1, ASSESS_WORKERS))
+    await pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+        await close_polza()
+        shutdown_tracing()
+
+
+if __name__ == "__main__":
+    # Standalone worker beside the gateway: python -m app.jobs
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -1,65 +1,89 @@
-import os
-from pathlib import Path
+import time
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import inspect, text
-from .db import engine
 
+from . import STARTED_AT
 from .routers.auth import router as auth_router
 from .routers.vacancies import router as vacancies_router
 from .routers.profiles import router as profiles_router
 from .routers.applications import router as applications_router
-from .db import init_db
+from .routers.admin import router as admin_router
+from .config import DB_STARTUP, METRICS_ENABLED, QUERY_DEBUG
+from .db import dispose_engines
+from .migrate import migrate, verify_schema
+from .integrations.polza import open_polza, close_polza
+from .jobs import worker_pool
+from .metrics import METRICS_PATH, MetricsMiddleware, metrics_response
+from .tracing import setup_tracing, shutdown_tracing
+from .query_budget import QueryCounterMiddleware, instrument_engines
+from .pagination import NEXT_CURSOR_HEADER
+from .utils.text_extract import shutdown_extract_pool
+from .utils.uploads import UploadLimitMiddleware
+from .utils.passwords import shutdown_password_pool
 
 
 app = FastAPI(title="HR Avatar Gateway")
+_startup_timings: dict[str, float] = {}
 
+# Innermost: oversized multipart bodies are refused before form parsing, with CORS headers on the 413
+app.add_middleware(UploadLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+if QUERY_DEBUG:
+    # Development: per-request SQL counts in response headers, warnings over the route's query budget
+    instrument_engines()
+    app.add_middleware(QueryCounterMiddleware)
+if METRICS_ENABLED:
+    # Outside CORS, so the latency includes its handling
+    app.add_middleware(MetricsMiddleware)
+# TRACING_ENABLED=1: route, SQL, Polza and extraction spans exported over OTLP (see app/tracing.py)
+setup_tracing(app)
 
 
 @app.on_event("startup")
 def _startup() -> None:
-    # Ensure base tables exist for a clean start
-    init_db()
-
-    # Then apply Alembic migrations (idempotent)
-    try:
-        from alembic import command
-        from alembic.config import Config
-
-        # Resolve path to alembic.ini copied to image root (/app)
-        # __file__ is /app/app/main.py → parent(1) is /app
-        root = Path(__file__).resolve().parents[1]
-        ini_path = os.getenv("ALEMBIC_INI", str(root / "alembic.ini"))
-        cfg = Config(ini_path)
-        command.upgrade(cfg, "head")
-    except Exception as e:
-        # If alembic not installed or migrations fail, continue; logs will show errors.
-        # In dev, you can run: docker compose run --rm api alembic -c /app/alembic.ini upgrade head
-        print(f"[alembic] upgrade failed or skipped: {e}")
-
-    # Safety net: ensure required columns exist (for cases when Alembic couldn't run)
-    try:
-        insp = inspect(engine)
-        cols = {c['name'] for c in insp.get_columns('vacancies')}
-        if 'status' not in cols:
-            with engine.begin() as conn:
-                conn.execute(text("ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS status VARCHAR(32) DEFAULT 'draft' NOT NULL"))
-                # Drop server default to align with ORM model
-                conn.execute(text("ALTER TABLE vacancies ALTER COLUMN status DROP DEFAULT"))
-        if 'details' not in cols:
-            with engine.begin() as conn:
-                conn.execute(text("ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS details JSON NOT NULL DEFAULT '{}'"))
-                conn.execute(text("ALTER TABLE vacancies ALTER COLUMN details DROP DEFAULT"))
-    except Exception as e:
-        print(f"[db] ensure columns failed: {e}")
+    # DB_STARTUP=migrate: create tables + alembic upgrade under an advisory lock (single-process/dev setups);
+    # verify: one revision query, migrations run separately via `python -m app.migrate`; skip: neither
+    t0 = time.perf_counter()
+    if DB_STARTUP == "verify":
+        verify_schema()
+    elif DB_STARTUP == "migrate":
+        try:
+            migrate()
+        except Exception as e:
+            # If alembic not installed or migrations fail, continue; logs will show errors.
+            # In dev, you can run: docker compose run --rm api python -m app.migrate
+            print(f"[alembic] upgrade failed or skipped: {e}")
+    _startup_timings["schema"] = time.perf_counter() - t0
+
+
+@app.on_event("startup")
+async def _startup_polza() -> None:
+    # One pooled keep-alive client per worker process, shared by all LLM-calling routes
+    await open_polza()
+    # Background assessment workers (ASSESS_WORKERS=0 when they run as a separate process)
+    await worker_pool.start()
+    print(
+        f"[startup] ready in {1000 * (time.perf_counter() - STARTED_AT):.0f} ms "
+        f"(schema {DB_STARTUP}: {1000 * _startup_timings.get('schema', 0):.0f} ms)"
+    )
+
+
+@app.on_event("shutdown")
+async def _shutdown_polza() -> None:
+    await worker_pool.stop()
+    await close_polza()
+    shutdown_extract_pool()
+    shutdown_password_pool()
+    await dispose_engines()
+    shutdown_tracing()
 
 
 @app.get("/health")
@@ -67,7 +91,15 @@ def health() -> dict:
     return {"status": "ok"}
 
 
+if METRICS_ENABLED:
+    @app.get(METRICS_PATH, include_in_schema=False)
+    def metrics():
+        # Prometheus text format for this worker process
+        return metrics_response()
+
+
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(vacancies_router, prefix="/vacancies", tags=["vacancies"])
 app.include_router(profiles_router, prefix="/profiles", tags=["profiles"])
 app.include_router(applications_router, prefix="/applications", tags=["applications"])
+app.include_router(admin_router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,176 @@
+"""
+Prometheus metrics for the gateway, exposed at GET /metrics (see main.py).
+
+Values are per worker process (the default registry): HTTP latency and in-flight requests per route template,
+Polza calls, fallbacks and token usage per client method, DB pool checkout wait and occupancy, and text
+extraction time per document format.
+"""
+from __future__ import annotations
+
+import re
+import time
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy.pool import Pool
+from starlette.responses import Response
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# Scrape endpoint (main.py); not instrumented itself
+METRICS_PATH = "/metrics"
+
+# --- HTTP ---
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ["method", "route", "status"],
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled", ["method", "route"])
+
+# --- Polza (LLM) ---
+POLZA_CALL_SECONDS = Histogram(
+    "polza_call_duration_seconds", "Completion call latency per client method", ["method", "outcome"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120),
+)
+POLZA_ERRORS = Counter("polza_errors_total", "Failed completion calls by exception type", ["method", "error"])
+POLZA_FALLBACKS = Counter("polza_fallbacks_total", "Results served by the heuristic/empty fallback instead of the LLM", ["method"])
+POLZA_TOKENS = Counter("polza_tokens_total", "Tokens reported by the provider", ["method", "kind"])
+
+# --- Database pool ---
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time to get a connection from the pool", ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# --- Text extraction ---
+EXTRACT_SECONDS = Histogram(
+    "text_extract_duration_seconds", "Upload text extraction time (queueing included) by format", ["format", "outcome"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+def timed_pool(base: type[Pool], engine: str) -> type[Pool]:
+    """`base` with checkout wait recorded in db_pool_checkout_wait_seconds{engine=...}; pass as create_engine(poolclass=...)."""
+    wait = DB_POOL_CHECKOUT_SECONDS.labels(engine)
+
+    class TimedPool(base):  # type: ignore[valid-type, misc]
+        # _do_get is where QueuePool blocks for a free connection (or opens a new one); recreate() keeps the class
+        def _do_get(self):
+            t0 = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                wait.observe(time.perf_counter() - t0)
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+class _PoolCollector(Collector):
+    """Pool size and occupancy, read from the live engines at scrape time."""
+
+    @staticmethod
+    def _families() -> dict[str, GaugeMetricFamily]:
+        return {
+            "size": GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["engine"]),
+            "checkedout": GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["engine"]),
+            "checkedin": GaugeMetricFamily("db_pool_checked_in", "Idle connections in the pool", labels=["engine"]),
+            "overflow": GaugeMetricFamily("db_pool_overflow", "Connections beyond pool_size (negative: not yet opened)", labels=["engine"]),
+        }
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        # Lets the registry learn the names without collecting (the engines do not exist yet at import)
+        yield from self._families().values()
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        from .db import async_engine, engine
+
+        engines = {"sync": engine}
+        if async_engine is not None:
+            engines["async"] = async_engine.sync_engine
+        families = self._families()
+        for name, eng in engines.items():
+            for attr, family in families.items():
+                # sqlite's pools (local runs) do not implement all of these
+                fn = getattr(eng.pool, attr, None)
+                if fn is not None:
+                    family.add_metric([name], fn())
+        yield from families.values()
+
+
+REGISTRY.register(_PoolCollector())
+
+
+# --- HTTP middleware and exposition ---
+class _RouteTemplates:
+    """
+    Maps a request to its route template ("/vacancies/{vacancy_id}") rather than the raw path, so label
+    cardinality stays bounded. Templates come from the app's OpenAPI paths (public across FastAPI versions,
+    unlike the router internals) in declaration order, i.e. the order the router matches them.
+    """
+
+    def __init__(self) -> None:
+        self._routes: list[tuple[re.Pattern[str], frozenset[str], str]] | None = None
+
+    def _load(self, app) -> list[tuple[re.Pattern[str], frozenset[str], str]]:
+        routes = []
+        for template, operations in app.openapi().get("paths", {}).items():
+            regex, _, _ = compile_path(template)
+            routes.append((regex, frozenset(m.upper() for m in operations), template))
+        return routes
+
+    def resolve(self, scope: Scope) -> str:
+        if self._routes is None:
+            self._routes = self._load(scope["app"])
+        path, method = scope["path"], scope["method"]
+        other_method = None
+        for regex, methods, template in self._routes:
+            if regex.match(path):
+                if method in methods or (method == "HEAD" and "GET" in methods):
+                    return template
+                other_method = other_method or template
+        # Paths outside the schema (/metrics, 404s) share one label
+        return other_method or "unmatched"
+
+
+_route_templates = _RouteTemplates()
+
+
+def route_template(scope: Scope) -> str:
+    """Route template for an HTTP scope, "unmatched" for paths outside the API schema."""
+    return _route_templates.resolve(scope)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no response buffering): latency histogram and in-flight gauge per route."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == METRICS_PATH:
+            await self.app(scope, receive, send)
+            return
+        method, route = scope["method"], route_template(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_SECONDS.labels(method, route, str(status_code)).observe(time.perf_counter() - t0)
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,124 @@
+"""
+Schema management: one-shot migration and the cheap revision check used by fast-start workers.
+
+    python -m app.migrate           # create_all + alembic upgrade head, under a Postgres advisory lock
+    python -m app.migrate --check   # exit 1 unless the database is at the head revision
+
+With DB_STARTUP=verify the gateway only runs the check on startup (one query) and leaves migrations
+to the command above, run once per deploy (e.g. `docker compose run --rm api python -m app.migrate`).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from .db import engine, init_db
+
+
+# pg_advisory_lock key shared by every process that may migrate ("hriqmig" in ASCII)
+MIGRATE_LOCK_ID = 0x6872_6971_6D69_67
+
+
+class SchemaMismatch(RuntimeError):
+    pass
+
+
+def alembic_config():
+    from alembic.config import Config
+
+    # alembic.ini sits next to the app package (/app in the image, apps/gateway locally)
+    root = Path(__file__).resolve().parents[1]
+    return Config(os.getenv("ALEMBIC_INI", str(root / "alembic.ini")))
+
+
+def head_revision() -> str | None:
+    """Head of the migration scripts shipped with this code (reads files, not the database)."""
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision() -> str | None:
+    """Revision recorded in the database; None when it was never migrated."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        return None
+
+
+@contextmanager
+def migration_lock() -> Iterator[None]:
+    """Session-level advisory lock: concurrent replicas migrate one at a time, the rest wait and find nothing to do."""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATE_LOCK_ID})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATE_LOCK_ID})
+            conn.commit()
+
+
+def _ensure_columns() -> None:
+    # Safety net for databases created before the vacancies migrations existed
+    cols = {c['name'] for c in inspect(engine).get_columns('vacancies')}
+    if 'status' not in cols:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS status VARCHAR(32) DEFAULT 'draft' NOT NULL"))
+            # Drop server default to align with ORM model
+            conn.execute(text("ALTER TABLE vacancies ALTER COLUMN status DROP DEFAULT"))
+    if 'details' not in cols:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS details JSON NOT NULL DEFAULT '{}'"))
+            conn.execute(text("ALTER TABLE vacancies ALTER COLUMN details DROP DEFAULT"))
+
+
+def migrate() -> None:
+    """Bring the database to head: base tables for a clean start, then Alembic migrations (both idempotent)."""
+    from alembic import command
+
+    with migration_lock():
+        init_db()
+        command.upgrade(alembic_config(), "head")
+        _ensure_columns()
+
+
+def verify_schema() -> str:
+    """Fast-start check: raise SchemaMismatch unless the database is at the head revision."""
+    head, current = head_revision(), current_revision()
+    if current != head:
+        raise SchemaMismatch(f"database schema is at {current or 'no revision'}, this build expects {head}; run `python -m app.migrate`")
+    return current
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.migrate")
+    ap.add_argument("--check", action="store_true", help="only verify the revision, do not migrate")
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    try:
+        if args.check:
+            rev = verify_schema()
+        else:
+            migrate()
+            rev = current_revision()
+    except SchemaMismatch as e:
+        print(f"[migrate] {e}")
+        sys.exit(1)
+    print(f"[migrate] schema at {rev} ({1000 * (time.perf_counter() - t0):.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import String, DateTime, Integer, ForeignKey, JSON, Text, UniqueConstraint, Float
+from sqlalchemy import String, DateTime, Integer, ForeignKey, JSON, Text, UniqueConstraint, Float, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .db import Base
@@ -15,17 +15,27 @@ class RoleEnum(str, Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     role: Mapped[str] = mapped_column(String(32), default=RoleEnum.hr.value, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Carried in tokens as "tv"; bumping it revokes every token issued before
+    token_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 class Vacancy(Base):
     __tablename__ = "vacancies"
+    __table_args__ = (
+        # HR list (owner) and public board (status), both paged by (created_at, id)
+        Index("ix_vacancies_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_vacancies_status_created", "status", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -56,6 +66,12 @@ class Profile(Base):
 
 class Application(Base):
     __tablename__ = "applications"
+    __table_args__ = (
+        UniqueConstraint("vacancy_id", "candidate_id", name="uq_applications_vacancy_candidate"),
+        # HR feed (vacancy_id IN ...) and candidate list, both paged by (created_at, id)
+        Index("ix_applications_vacancy_created", "vacancy_id", "created_at", "id"),
+        Index("ix_applications_candidate_created", "candidate_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     vacancy_id: Mapped[int] = mapped_column(ForeignKey("vacancies.id"), nullable=False)
@@ -64,5 +80,67 @@ class Application(Base):
     match_score: Mapped[float | None] = mapped_column(Float, nullable=True, default=None)
     verdict: Mapped[str | None] = mapped_column(String(32), nullable=True)  # accept/reject/neutral
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
+    assessed_by: Mapped[str | None] = mapped_column(String(16), nullable=True)  # llm/prefilter/fallback/hr
     profile_snapshot: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 of method/model/prompt/input
+    method: Mapped[str] = mapped_column(String(64), index=True, nullable=False)
+    model: Mapped[str] = mapped_column(String(128), index=True, nullable=False)
+    result: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ExtractionCacheEntry(Base):
+    __tablename__ = "extraction_cache"
+
+    digest: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 of the uploaded bytes
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)  # resume, vacancy
+    text_version: Mapped[str] = mapped_column(String(64), nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    parser_version: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    parsed: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True, nullable=False)
+
+
+class AssessmentJob(Base):
+    __tablename__ = "assessment_jobs"
+    __table_args__ = (
+        Index("ix_assessment_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    application_id: Mapped[int] = mapped_column(ForeignKey("applications.id", ondelete="CASCADE"), index=True, nullable=False)
+    status: Mapped[str] = mapped_column(String(32), nullable=False, default="queued")  # queued, running, done, dead
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=5)
+    run_after: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class ReassessRun(Base):
+    __tablename__ = "reassess_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    vacancy_id: Mapped[int] = mapped_column(ForeignKey("vacancies.id", ondelete="CASCADE"), index=True, nullable=False)
+    requested_by: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    status: Mapped[str] = mapped_column(String(32), nullable=False, default="running")  # running, done, failed
+    concurrency: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    llm_skipped: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # scored by prefilter only
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,76 @@
+"""
+Keyset pagination on (created_at, id) for list endpoints.
+
+Responses stay plain JSON arrays; the opaque cursor for the next page is returned in the
+X-Next-Cursor header (absent on the last page) and passed back as ?cursor=...
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Dependency with the shared ?limit=&cursor= query parameters."""
+
+    def __init__(
+        self,
+        limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+        cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(created_at: datetime, id_: int) -> str:
+    raw = json.dumps([created_at.isoformat(), id_]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id_ = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id_)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from None
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    model: Any,
+    page: PageParams,
+    response: Response,
+    descending: bool = True,
+) -> list[Any]:
+    """
+    One page of `stmt` ordered by model's (created_at, id); sets X-Next-Cursor when more rows follow.
+    Entity selects return objects; column selects return rows, which must include created_at and id labels.
+    """
+    key = tuple_(model.created_at, model.id)
+    if page.cursor:
+        after = tuple_(*decode_cursor(page.cursor))
+        stmt = stmt.where(key < after if descending else key > after)
+    if descending:
+        stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        stmt = stmt.order_by(model.created_at.asc(), model.id.asc())
+    # One extra row tells whether there is a next page without a COUNT
+    result = await db.execute(stmt.limit(page.limit + 1))
+    rows = list(result.scalars().all() if len(stmt.column_descriptions) == 1 else result.all())
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows
@@ -0,0 +1,198 @@
+"""
+Per-request SQL accounting for development (QUERY_DEBUG=1).
+
+Engine events count the statements a request executes and the time spent in them. The middleware reports both in
+X-DB-Queries / X-DB-Time-Ms headers, together with the route's budget (X-DB-Query-Budget) and the most times a single
+statement ran (X-DB-Repeated). A route over its budget, or one repeating a statement QUERY_REPEAT_WARN times (the
+N+1 shape: one query per row of an earlier result), is logged as a warning; with QUERY_BUDGET_STRICT=1 the request
+raises QueryBudgetExceeded instead, so TestClient-based checks fail on it.
+
+Budgets are for a cold user cache (authentication included). `python -m benchmarks.check_query_budgets` runs every
+router against them.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import QUERY_BUDGET_DEFAULT, QUERY_BUDGET_STRICT, QUERY_REPEAT_WARN
+from .metrics import route_template
+
+
+log = logging.getLogger(__name__)
+
+# "METHOD /route/template" -> max SQL statements with a cold user cache (the user lookup is one of them);
+# routes not listed get QUERY_BUDGET_DEFAULT. Lower an entry when a route gets cheaper.
+QUERY_BUDGETS: dict[str, int] = {
+    # auth
+    "POST /auth/signup": 3,
+    "POST /auth/login": 1,
+    "POST /auth/refresh": 1,
+    "POST /auth/bootstrap-admin": 3,
+    "GET /auth/me": 1,
+    "POST /auth/create-hr": 4,
+    "GET /auth/users": 2,
+    # vacancies
+    "POST /vacancies/": 3,
+    "GET /vacancies/": 2,
+    "GET /vacancies/public": 1,
+    "GET /vacancies/{vacancy_id}": 2,
+    "PATCH /vacancies/{vacancy_id}": 2,
+    "DELETE /vacancies/{vacancy_id}": 3,
+    "POST /vacancies/upload": 6,
+    "POST /vacancies/{vacancy_id}/approve": 2,
+    "POST /vacancies/{vacancy_id}/archive": 2,
+    "POST /vacancies/{vacancy_id}/unarchive": 2,
+    "POST /vacancies/{vacancy_id}/revoke": 2,
+    "POST /vacancies/{vacancy_id}/reassess": 6,
+    "GET /vacancies/{vacancy_id}/reassess/{run_id}": 3,
+    # profiles
+    "GET /profiles/me": 2,
+    "POST /profiles/upload": 7,
+    # applications
+    "POST /applications/": 7,
+    "GET /applications/me": 2,
+    "GET /applications/hr": 2,
+    "GET /applications/hr/feed": 2,
+    "PATCH /applications/{app_id}": 2,
+    "POST /applications/{app_id}/assess": 5,  # LLM down: + pending-job lookup and INSERT
+    "GET /applications/{app_id}/assessment": 4,
+    # admin
+    "GET /admin/llm-cache": 1,
+    "DELETE /admin/llm-cache": 2,
+    "GET /admin/extraction-cache": 1,
+    "DELETE /admin/extraction-cache": 2,
+    "GET /admin/public-board": 1,
+    "GET /admin/user-cache": 1,
+    "GET /admin/polza": 1,
+    "GET /admin/screening": 1,
+    "GET /admin/assessment-jobs": 2,
+    "GET /health": 0,
+}
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def most_repeated(self) -> tuple[str, int]:
+        top = self.statements.most_common(1)
+        return top[0] if top else ("", 0)
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Count the statements run in this context, including threadpool calls and async-engine greenlets it makes."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# --- engine events (installed by instrument_engines, only in QUERY_DEBUG mode) ---
+def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _record(conn, statement: str) -> None:
+    stats = _current.get()
+    started = conn.info.get("query_started")
+    if stats is None or not started:
+        return
+    stats.seconds += time.perf_counter() - started.pop()
+    stats.count += 1
+    stats.statements[statement] += 1
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    _record(conn, statement)
+
+
+def _on_error(exception_context) -> None:
+    if exception_context.connection is not None and exception_context.statement is not None:
+        _record(exception_context.connection, exception_context.statement)
+
+
+def instrument_engines() -> None:
+    from .db import async_engine, engine
+
+    for eng in [engine] + ([async_engine.sync_engine] if async_engine is not None else []):
+        if not event.contains(eng, "before_cursor_execute", _before_execute):
+            event.listen(eng, "before_cursor_execute", _before_execute)
+            event.listen(eng, "after_cursor_execute", _after_execute)
+            event.listen(eng, "handle_error", _on_error)
+
+
+def budget_for(route: str) -> int:
+    return QUERY_BUDGETS.get(route, QUERY_BUDGET_DEFAULT)
+
+
+def _check(route: str, budget: int, count: int, statement: str, repeats: int) -> None:
+    problems = []
+    if count > budget:
+        problems.append(f"{count} SQL statements, budget {budget}")
+    if repeats >= QUERY_REPEAT_WARN:
+        problems.append(f"one statement ran {repeats} times (N+1?): {' '.join(statement.split())[:200]}")
+    if not problems:
+        return
+    message = f"{route}: " + "; ".join(problems)
+    if QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(message)
+    log.warning("query budget: %s", message)
+
+
+class QueryCounterMiddleware:
+    """
+    Pure ASGI middleware. Counts are taken when the response starts, so background tasks that run
+    after the response (e.g. a re-assessment run) are not charged to the route.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = f"{scope['method']} {route_template(scope)}"
+        budget = budget_for(route)
+        reported: tuple[int, str, int] | None = None
+
+        with count_queries() as stats:
+            async def send_wrapper(message: Message) -> None:
+                nonlocal reported
+                if message["type"] == "http.response.start":
+                    statement, repeats = stats.most_repeated()
+                    reported = (stats.count, statement, repeats)
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(stats.count)
+                    headers["X-DB-Time-Ms"] = f"{1000 * stats.seconds:.1f}"
+                    headers["X-DB-Query-Budget"] = str(budget)
+                    headers["X-DB-Repeated"] = str(repeats)
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+        if reported is not None:
+            _check(route, budget, *reported)
@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import schemas
+from ..security import get_db, require_role
+from ..models import AssessmentJob, RoleEnum
+from ..integrations.llm_cache import llm_cache
+from ..integrations.extract_cache import extraction_cache
+from ..integrations.polza import polza_health
+from ..scoring import screening_stats
+from ..board_cache import public_board
+from ..user_cache import user_cache
+from ..jobs import requeue_job
+
+
+router = APIRouter(dependencies=[Depends(require_role(RoleEnum.admin.value))])
+
+
+@router.get("/llm-cache")
+async def llm_cache_stats() -> dict:
+    return llm_cache.stats()
+
+
+@router.delete("/llm-cache")
+def purge_llm_cache(method: str | None = Query(None), model: str | None = Query(None)) -> dict:
+    # Clears the shared table and this worker's memory tier; other workers' memory tiers expire by TTL
+    removed = llm_cache.purge(method=method, model=model)
+    return {"removed": removed}
+
+
+@router.get("/extraction-cache")
+async def extraction_cache_stats() -> dict:
+    return extraction_cache.stats()
+
+
+@router.delete("/extraction-cache")
+def purge_extraction_cache(kind: str | None = Query(None)) -> dict:
+    return {"removed": extraction_cache.purge(kind=kind)}
+
+
+@router.get("/public-board")
+async def public_board_stats() -> dict:
+    return public_board.stats()
+
+
+@router.get("/user-cache")
+async def user_cache_stats() -> dict:
+    return user_cache.stats()
+
+
+@router.get("/polza")
+async def polza_status() -> dict:
+    # Per-method breaker state, p95 latency and current deadline, plus response_format support per model
+    return polza_health()
+
+
+@router.get("/screening")
+async def screening_counters() -> dict:
+    # Applicants sent to the LLM vs. scored by the prefilter alone (this worker, since start)
+    return dict(screening_stats)
+
+
+@router.get("/assessment-jobs", response_model=list[schemas.AssessmentJobPublic])
+async def list_assessment_jobs(status_: str | None = Query("dead", alias="status"), limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_db)):
+    q = select(AssessmentJob)
+    if status_:
+        q = q.where(AssessmentJob.status == status_)
+    return (await db.scalars(q.order_by(AssessmentJob.updated_at.desc()).limit(limit))).all()
+
+
+@router.post("/assessment-jobs/{job_id}/retry", response_model=schemas.AssessmentJobPublic)
+async def retry_assessment_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await db.get(AssessmentJob, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if job.status != "dead":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only dead-lettered jobs can be retried")
+    await db.run_sync(requeue_job, job)
+    await db.commit()
+    await db.refresh(job)
+    return job
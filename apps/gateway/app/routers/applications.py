@@ -1,121 +1,204 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import Select, case, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..security import get_db, get_current_user, require_role
 from ..models import Application, Vacancy, User, RoleEnum, Profile
 from .. import schemas
-from ..integrations.polza import PolzaClient
-from ..config import INVITE_THRESHOLD
+from ..integrations.polza import get_polza
+from ..jobs import enqueue_assessment, latest_job, apply_assessment, vacancy_payload
+from ..pagination import PageParams, paginate
+from ..transitions import transition
+
 
+log = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+class ApplicationFilters:
+    """Server-side filters shared by the application lists."""
+
+    def __init__(
+        self,
+        status_: str | None = Query(None, alias="status"),
+        vacancy_id: int | None = Query(None),
+        verdict: str | None = Query(None),
+        min_score: float | None = Query(None, ge=0),
+    ):
+        self.status = status_
+        self.vacancy_id = vacancy_id
+        self.verdict = verdict
+        self.min_score = min_score
+
+    def apply(self, q: Select) -> Select:
+        if self.status:
+            q = q.where(Application.status == self.status)
+        if self.vacancy_id is not None:
+            q = q.where(Application.vacancy_id == self.vacancy_id)
+        if self.verdict:
+            q = q.where(Application.verdict == self.verdict)
+        if self.min_score is not None:
+            q = q.where(Application.match_score >= self.min_score)
+        return q
+
+
 @router.post("/", response_model=schemas.ApplicationPublic, status_code=201, dependencies=[Depends(require_role(RoleEnum.candidate.value, RoleEnum.admin.value))])
-def apply(payload: schemas.ApplicationCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    vac = db.query(Vacancy).filter(Vacancy.id == payload.vacancy_id).first()
+async def apply(payload: schemas.ApplicationCreate, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    vac = await db.get(Vacancy, payload.vacancy_id)
     if not vac:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Vacancy not found")
     if vac.status != "approved":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Отклик возможен только на утверждённые вакансии")
-    # prevent duplicates
-    existing = db.query(Application).filter(Application.vacancy_id == vac.id, Application.candidate_id == current.id).first()
-    if existing:
-        return existing
     # snapshot candidate profile if exists
     snap = {}
-    prof = db.query(Profile).filter(Profile.owner_id == current.id).first()
+    prof = await db.scalar(select(Profile).where(Profile.owner_id == current.id))
     if prof:
         snap = {"summary": prof.summary, "skills": prof.skills, "details": prof.details}
-    app = Application(vacancy_id=vac.id, candidate_id=current.id, status="applied", profile_snapshot=snap)
-    db.add(app)
-    db.commit(); db.refresh(app)
-    # Auto-assess via AI
-    try:
-        client = PolzaClient()
-        vac_payload = {"title": vac.title, "description": vac.description, "seniority": vac.seniority, "skills": vac.skills, "weights": vac.weights, "details": getattr(vac, 'details', {})}
-        prof_payload = snap or {}
-        result = client.assess_application(vac_payload, prof_payload)
-        app.match_score = result.get("match_score")
-        app.verdict = result.get("verdict")
-        app.notes = result.get("notes")
-        # decide on invite
-        try:
-            score = float(app.match_score or 0)
-        except Exception:
-            score = 0.0
-        app.status = "invited" if (app.verdict == "accept" and score >= INVITE_THRESHOLD) else "assessed"
-        db.add(app); db.commit(); db.refresh(app)
-    except Exception:
-        pass
-    return app
+    # One application per (vacancy, candidate): the unique constraint decides, a repeat returns the existing row
+    stmt = (
+        insert(Application)
+        .values(vacancy_id=vac.id, candidate_id=current.id, status="applied", profile_snapshot=snap)
+        .on_conflict_do_nothing(index_elements=[Application.vacancy_id, Application.candidate_id])
+        .returning(Application.id)
+    )
+    app_id = await db.scalar(stmt)
+    if app_id is None:
+        return await db.scalar(select(Application).where(Application.vacancy_id == vac.id, Application.candidate_id == current.id))
+    # Auto-assess via AI in the background queue (same transaction, so the job can't be lost)
+    await db.run_sync(enqueue_assessment, app_id)
+    await db.commit()
+    return await db.get(Application, app_id)
 
 
 @router.get("/me", response_model=list[schemas.ApplicationPublic], dependencies=[Depends(require_role(RoleEnum.candidate.value, RoleEnum.admin.value))])
-def my_applications(db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    q = db.query(Application).filter(Application.candidate_id == current.id)
-    return q.order_by(Application.created_at.desc()).all()
+async def my_applications(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ApplicationFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    q = filters.apply(select(Application).where(Application.candidate_id == current.id))
+    return await paginate(db, q, Application, page, response)
 
 
 @router.get("/hr", response_model=list[schemas.ApplicationPublic], dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def hr_applications(db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+async def hr_applications(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ApplicationFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
     # list applications for vacancies owned by this HR (or all for admin)
-    q = db.query(Application)
+    q = filters.apply(select(Application))
     if current.role == RoleEnum.hr.value:
-        # join-like filter: applications on vacancies owned by current HR
-        vac_ids = [v.id for v in db.query(Vacancy).filter(Vacancy.owner_id == current.id).all()]
-        if not vac_ids:
-            return []
-        q = q.filter(Application.vacancy_id.in_(vac_ids))
-    return q.order_by(Application.created_at.desc()).all()
+        q = q.where(Application.vacancy_id.in_(select(Vacancy.id).where(Vacancy.owner_id == current.id)))
+    return await paginate(db, q, Application, page, response)
+
+
+@router.get("/hr/feed", response_model=list[schemas.HrApplicationFeedItem], dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
+async def hr_application_feed(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ApplicationFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    # One query for the dashboard: application columns plus vacancy title/status and candidate name/email
+    q = filters.apply(
+        select(
+            Application.id,
+            Application.vacancy_id,
+            Application.candidate_id,
+            Application.status,
+            Application.match_score,
+            Application.verdict,
+            Application.notes,
+            Application.assessed_by,
+            Application.profile_snapshot,
+            Application.created_at,
+            Vacancy.title.label("vacancy_title"),
+            Vacancy.status.label("vacancy_status"),
+            User.name.label("candidate_name"),
+            User.email.label("candidate_email"),
+        )
+        .join(Vacancy, Vacancy.id == Application.vacancy_id)
+        .join(User, User.id == Application.candidate_id)
+    )
+    if current.role == RoleEnum.hr.value:
+        q = q.where(Vacancy.owner_id == current.id)
+    return await paginate(db, q, Application, page, response)
 
 
 @router.patch("/{app_id}", response_model=schemas.ApplicationPublic, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def update_application(app_id: int, payload: schemas.ApplicationUpdate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    app = db.query(Application).filter(Application.id == app_id).first()
-    if not app:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+async def update_application(app_id: int, payload: schemas.ApplicationUpdate, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    values = {f: getattr(payload, f) for f in ["status", "match_score", "verdict", "notes"] if getattr(payload, f) is not None}
+    # If HR sets match_score and verdict but didn't set status, move to assessed
+    if payload.match_score is not None and not payload.status:
+        if payload.verdict:
+            values["status"] = "assessed"
+        elif payload.verdict is None:
+            values["status"] = case((func.coalesce(Application.verdict, "") != "", "assessed"), else_=Application.status)
+    if payload.match_score is not None or payload.verdict is not None:
+        values["assessed_by"] = "hr"
     # Restrict HR to own vacancies
+    scope = None
     if current.role == RoleEnum.hr.value:
-        vac = db.query(Vacancy).filter(Vacancy.id == app.vacancy_id).first()
-        if not vac or vac.owner_id != current.id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    # Apply updates
-    for field in ["status", "match_score", "verdict", "notes"]:
-        val = getattr(payload, field)
-        if val is not None:
-            setattr(app, field, val)
-    # If HR sets match_score and verdict but didn't set status, move to assessed
-    if payload.match_score is not None and (payload.verdict or app.verdict) and not payload.status:
-        app.status = "assessed"
-    db.add(app); db.commit(); db.refresh(app)
-    return app
+        scope = Application.vacancy_id.in_(select(Vacancy.id).where(Vacancy.owner_id == current.id))
+    return await transition(db, Application, app_id, values, scope=scope)
 
 
-@router.post("/{app_id}/assess", response_model=schemas.ApplicationPublic, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def reassess_application(app_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    app = db.query(Application).filter(Application.id == app_id).first()
+@router.post(
+    "/{app_id}/assess",
+    response_model=schemas.ApplicationPublic,
+    responses={202: {"description": "LLM unavailable: queued as an assessment job, see GET /applications/{app_id}/assessment"}},
+    dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))],
+)
+async def reassess_application(app_id: int, response: Response, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    app = await db.get(Application, app_id)
     if not app:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
-    vac = db.query(Vacancy).filter(Vacancy.id == app.vacancy_id).first()
+    vac = await db.get(Vacancy, app.vacancy_id)
     if not vac:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Vacancy not found")
     if current.role == RoleEnum.hr.value and vac.owner_id != current.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    await db.commit()  # don't hold a pooled connection through the LLM call
     try:
-        client = PolzaClient()
-        vac_payload = {"title": vac.title, "description": vac.description, "seniority": vac.seniority, "skills": vac.skills, "weights": vac.weights, "details": getattr(vac, 'details', {})}
+        client = get_polza()
         prof_payload = app.profile_snapshot or {}
-        result = client.assess_application(vac_payload, prof_payload)
-        app.match_score = result.get("match_score")
-        app.verdict = result.get("verdict")
-        app.notes = result.get("notes")
-        try:
-            score = float(app.match_score or 0)
-        except Exception:
-            score = 0.0
-        app.status = "invited" if (app.verdict == "accept" and score >= INVITE_THRESHOLD) else "assessed"
-        db.add(app); db.commit(); db.refresh(app)
-    except Exception:
-        pass
+        result = await client.assess_application(vacancy_payload(vac), prof_payload, fallback=False)
+    except Exception as e:
+        # Hand it to the assessment queue (retries with backoff) instead of answering 200 with the old score
+        log.warning("re-assessment of application %s failed, queued as a job: %s: %s", app_id, type(e).__name__, e)
+        await db.run_sync(enqueue_assessment, app.id)
+        await db.commit()
+        response.status_code = status.HTTP_202_ACCEPTED
+        return app
+    apply_assessment(app, result)
+    db.add(app)
+    await db.commit()
+    await db.refresh(app)
     return app
+
+
+@router.get("/{app_id}/assessment", response_model=schemas.AssessmentJobPublic)
+async def get_assessment_job(app_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    app = await db.get(Application, app_id)
+    if not app:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if current.role == RoleEnum.candidate.value and app.candidate_id != current.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    if current.role == RoleEnum.hr.value:
+        vac = await db.get(Vacancy, app.vacancy_id)
+        if not vac or vac.owner_id != current.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    job = await db.run_sync(latest_job, app.id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No assessment job")
+    return job
@@ -1,65 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import schemas
 from ..models import User, RoleEnum
 from ..security import (
     get_db,
-    hash_password,
-    verify_password,
     create_access_refresh,
     decode_token,
     get_current_user,
+    user_from_token,
 )
-from ..config import ADMIN_BOOTSTRAP_TOKEN
+from ..config import ADMIN_BOOTSTRAP_TOKEN, LOGIN_RATE_IP, LOGIN_BURST_IP, LOGIN_RATE_EMAIL, LOGIN_BURST_EMAIL
+from ..utils.passwords import PasswordPoolBusy, hash_password_async, verify_and_update_async
+from ..utils.ratelimit import TokenBucketLimiter, client_ip
+from ..pagination import PageParams, paginate
 
 
 router = APIRouter()
 
+login_by_ip = TokenBucketLimiter(LOGIN_RATE_IP, LOGIN_BURST_IP)
+login_by_email = TokenBucketLimiter(LOGIN_RATE_EMAIL, LOGIN_BURST_EMAIL)
+
+
+async def _hash(password: str) -> str:
+    # bcrypt runs in the password pool; when its backlog is full, shed load instead of queueing
+    try:
+        return await hash_password_async(password)
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
+
 
 @router.post("/signup", response_model=schemas.UserPublic)
-def signup(payload: schemas.SignupRequest, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
+async def signup(payload: schemas.SignupRequest, db: AsyncSession = Depends(get_db)):
+    existing = await db.scalar(select(User).where(User.email == payload.email))
     if existing:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
     user = User(
         email=payload.email,
         name=payload.name,
         role=RoleEnum.candidate.value,  # публичная регистрация — только кандидат
-        password_hash=hash_password(payload.password),
+        password_hash=await _hash(payload.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.post("/login", response_model=schemas.TokenPair)
-def login(payload: schemas.LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: schemas.LoginRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    # Throttle before any DB or bcrypt work: per targeted account, and per client IP (resolved through TRUSTED_PROXIES)
+    ip = client_ip(request)
+    wait = max(login_by_ip.take(ip), login_by_email.take(payload.email.lower()))
+    if wait:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many login attempts", headers={"Retry-After": str(int(wait) + 1)})
+    user = await db.scalar(select(User).where(User.email == payload.email))
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    await db.commit()  # don't hold a pooled connection while bcrypt runs
+    try:
+        ok, new_hash = await verify_and_update_async(payload.password, user.password_hash)
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
+    if not ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # Same password under the current cost parameters: a bulk UPDATE, so it is not seen as a
+        # password change (which would bump token_version and revoke the user's sessions)
+        await db.execute(update(User).where(User.id == user.id, User.password_hash == user.password_hash).values(password_hash=new_hash))
+        await db.commit()
     access, refresh = create_access_refresh(user)
     return schemas.TokenPair(access_token=access, refresh_token=refresh)
 
 
 @router.post("/refresh", response_model=schemas.TokenPair)
-def refresh(payload: schemas.RefreshRequest, db: Session = Depends(get_db)):
+async def refresh(payload: schemas.RefreshRequest, db: AsyncSession = Depends(get_db)):
     data = decode_token(payload.refresh_token)
     if data.get("type") != "refresh":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Not a refresh token")
-    email = data.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    user = await user_from_token(data, db)
     access, refresh = create_access_refresh(user)
     return schemas.TokenPair(access_token=access, refresh_token=refresh)
 
 
 @router.post("/bootstrap-admin", response_model=schemas.UserPublic)
-def bootstrap_admin(payload: schemas.BootstrapAdminRequest, db: Session = Depends(get_db)):
+async def bootstrap_admin(payload: schemas.BootstrapAdminRequest, db: AsyncSession = Depends(get_db)):
     # Only allowed if there are no users at all and token matches env
-    count = db.query(User).count()
+    count = await db.scalar(select(func.count()).select_from(User))
     if count > 0:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Already initialized")
     if not ADMIN_BOOTSTRAP_TOKEN or payload.token != ADMIN_BOOTSTRAP_TOKEN:
@@ -69,45 +97,51 @@ def bootstrap_admin(payload: schemas.BootstrapAdminRequest, db: Session = Depend
         email=payload.email,
         name=payload.name,
         role=RoleEnum.admin.value,
-        password_hash=hash_password(payload.password),
+        password_hash=await _hash(payload.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.get("/me", response_model=schemas.UserPublic)
-def me(current: User = Depends(get_current_user)):
+async def me(current: User = Depends(get_current_user)):
     return current
 
 
 @router.post("/create-hr", response_model=schemas.UserPublic)
-def create_hr(payload: schemas.CreateHRRequest, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+async def create_hr(payload: schemas.CreateHRRequest, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
     # only admin can create HR accounts
     if current.role != RoleEnum.admin.value:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    existing = db.query(User).filter(User.email == payload.email).first()
+    existing = await db.scalar(select(User).where(User.email == payload.email))
     if existing:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
     user = User(
         email=payload.email,
         name=payload.name,
         role=RoleEnum.hr.value,
-        password_hash=hash_password(payload.password),
+        password_hash=await _hash(payload.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.get("/users", response_model=list[schemas.UserPublic])
-def list_users(role: str | None = Query(None), db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+async def list_users(
+    response: Response,
+    page: PageParams = Depends(),
+    role: str | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
     # only admin can list users
     if current.role != RoleEnum.admin.value:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    q = db.query(User)
+    q = select(User)
     if role:
-        q = q.filter(User.role == role)
-    return q.order_by(User.created_at.asc()).all()
+        q = q.where(User.role == role)
+    return await paginate(db, q, User, page, response, descending=False)
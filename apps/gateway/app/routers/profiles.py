@@ -1,43 +1,67 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..security import get_db, get_current_user, require_role
 from ..models import User, RoleEnum, Profile
 from .. import schemas
-from ..utils.text_extract import extract_text_smart
-from ..integrations.polza import PolzaClient
+from ..utils.text_extract import extract_text_async, text_version, DocumentTooLarge, ExtractionError
+from ..integrations.polza import PolzaClient, get_polza, parser_version
+from ..integrations.extract_cache import extraction_cache
+from ..utils.uploads import spool_upload, UploadTooLarge
 
 
 router = APIRouter()
 
 
 @router.get("/me", response_model=schemas.ProfilePublic, dependencies=[Depends(require_role(RoleEnum.candidate.value, RoleEnum.admin.value))])
-def get_my_profile(db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    prof = db.query(Profile).filter(Profile.owner_id == current.id).first()
+async def get_my_profile(db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    prof = await db.scalar(select(Profile).where(Profile.owner_id == current.id))
     if not prof:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
     return prof
 
 
 @router.post("/upload", response_model=schemas.ProfilePublic, status_code=201, dependencies=[Depends(require_role(RoleEnum.candidate.value, RoleEnum.admin.value))])
-async def upload_resume(file: UploadFile = File(...), db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    raw = await file.read()
-    if not raw:
-        raise HTTPException(status_code=400, detail="Empty file")
-    text = extract_text_smart(raw, file.filename, file.content_type)
+async def upload_resume(file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    # Streamed to a temp file with the size limit enforced while reading; parsers read from the path
+    try:
+        upload = await spool_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    # Repeat uploads of the same file reuse the extracted text and the parsed profile
+    try:
+        if not upload.size:
+            raise HTTPException(status_code=400, detail="Empty file")
+        tver, pver = text_version(file.filename, file.content_type), parser_version("resume")
+        text, data = await extraction_cache.alookup(upload.digest, "resume", tver, pver)
+        fresh_text = text is None
+        if fresh_text:
+            try:
+                text = await extract_text_async(upload.path, file.filename, file.content_type)
+            except DocumentTooLarge as e:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+            except ExtractionError as e:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    finally:
+        upload.close()
     if not (text or '').strip():
         raise HTTPException(status_code=400, detail="Резюме распознано, но текста не найдено")
-    # Parse via LLM or fallback
-    data = None
-    try:
-        client = PolzaClient()
-        data = client.extract_profile(text)
-    except Exception:
-        data = PolzaClient.extract_profile_fallback(text)
-    if not data:
-        raise HTTPException(status_code=502, detail="Parsing failed")
+    # Parse via LLM or fallback; only LLM results are cached
+    parsed_by_llm = False
+    if data is None:
+        try:
+            client = get_polza()
+            data = await client.extract_profile(text)
+            parsed_by_llm = bool(data)
+        except Exception:
+            data = PolzaClient.extract_profile_fallback(text)
+        if not data:
+            raise HTTPException(status_code=502, detail="Parsing failed")
+    if fresh_text or parsed_by_llm:
+        await extraction_cache.astore(upload.digest, "resume", tver, text, upload.size, pver, data if parsed_by_llm else None)
 
-    prof = db.query(Profile).filter(Profile.owner_id == current.id).first()
+    prof = await db.scalar(select(Profile).where(Profile.owner_id == current.id))
     if not prof:
         prof = Profile(owner_id=current.id, summary=data.get('summary') or '', skills=data.get('skills') or [], details=data.get('details') or {})
         db.add(prof)
@@ -45,21 +69,21 @@ async def upload_resume(file: UploadFile = File(...), db: Session = Depends(get_
         prof.summary = data.get('summary') or prof.summary
         prof.skills = data.get('skills') or prof.skills
         prof.details = data.get('details') or prof.details
-    db.commit()
-    db.refresh(prof)
+    await db.commit()
+    await db.refresh(prof)
     return prof
 
 
 @router.post("/generate", response_model=schemas.ProfilePublic, status_code=201, dependencies=[Depends(require_role(RoleEnum.candidate.value, RoleEnum.admin.value))])
-def generate_profile(payload: schemas.ProfileBrief, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+async def generate_profile(payload: schemas.ProfileBrief, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
     summary = payload.summary or ''
     highlights = payload.highlights or []
     details = payload.details or {}
     data = None
     try:
-        client = PolzaClient()
+        client = get_polza()
         brief_text = summary + ("\n- " + "\n- ".join(highlights) if highlights else "")
-        data = client.generate_profile(brief_text)
+        data = await client.generate_profile(brief_text)
     except Exception:
         data = None
     if not data:
@@ -77,7 +101,7 @@ def generate_profile(payload: schemas.ProfileBrief, db: Session = Depends(get_db
             if s not in seen: seen.add(s); uniq.append(s)
         data = {"summary": summary, "skills": uniq[:12], "details": details}
 
-    prof = db.query(Profile).filter(Profile.owner_id == current.id).first()
+    prof = await db.scalar(select(Profile).where(Profile.owner_id == current.id))
     if not prof:
         prof = Profile(owner_id=current.id, summary=data.get('summary') or '', skills=data.get('skills') or [], details=data.get('details') or {})
         db.add(prof)
@@ -88,6 +112,7 @@ def generate_profile(payload: schemas.ProfileBrief, db: Session = Depends(get_db
         det = dict(prof.details or {})
         det.update(data.get('details') or {})
         prof.details = det
-    db.commit(); db.refresh(prof)
+    await db.commit()
+    await db.refresh(prof)
     return prof
 
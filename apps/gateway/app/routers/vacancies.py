@@ -1,19 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status, UploadFile, File, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import schemas
-from ..models import Vacancy
+from ..models import Vacancy, ReassessRun
 from ..security import get_db, require_role, get_current_user
 from ..models import User, RoleEnum
-from ..integrations.polza import PolzaClient
-from ..utils.text_extract import extract_text_smart
+from ..integrations.polza import PolzaClient, get_polza, parser_version
+from ..utils.text_extract import extract_text_async, text_version, DocumentTooLarge, ExtractionError
+from ..integrations.extract_cache import extraction_cache
+from ..utils.uploads import spool_upload, UploadTooLarge
+from ..jobs import expire_stale_run, start_reassess_run, run_reassess
+from ..pagination import NEXT_CURSOR_HEADER, PageParams, paginate
+from ..board_cache import public_board, etag_matches
+from ..transitions import transition
+from ..config import REASSESS_CONCURRENCY, REASSESS_MAX_CONCURRENCY
 
 
 router = APIRouter()
 
 
+def _owned_by(current: User):
+    # HR users act on their own vacancies only; admins on any
+    return Vacancy.owner_id == current.id if current.role == RoleEnum.hr.value else None
+
+
 @router.post("/", response_model=schemas.VacancyPublic, status_code=201, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def create_vacancy(payload: schemas.VacancyCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+async def create_vacancy(payload: schemas.VacancyCreate, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
     v = Vacancy(
         title=payload.title,
         description=payload.description,
@@ -25,28 +39,63 @@ def create_vacancy(payload: schemas.VacancyCreate, db: Session = Depends(get_db)
         owner_id=current.id,
     )
     db.add(v)
-    db.commit()
-    db.refresh(v)
+    await db.commit()
+    public_board.invalidate()
+    await db.refresh(v)
     return v
 
 
 @router.get("/", response_model=list[schemas.VacancyPublic], dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def list_vacancies(db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    q = db.query(Vacancy)
+async def list_vacancies(
+    response: Response,
+    page: PageParams = Depends(),
+    status_: str | None = Query(None, alias="status"),
+    seniority: str | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    q = select(Vacancy)
     if current.role == RoleEnum.hr.value:
-        q = q.filter(Vacancy.owner_id == current.id)
-    return q.order_by(Vacancy.created_at.desc()).all()
+        q = q.where(Vacancy.owner_id == current.id)
+    if status_:
+        q = q.where(Vacancy.status == status_)
+    if seniority:
+        q = q.where(Vacancy.seniority == seniority)
+    return await paginate(db, q, Vacancy, page, response)
+
+
+_public_page = TypeAdapter(list[schemas.VacancyPublic])
 
 
 @router.get("/public", response_model=list[schemas.VacancyPublic])
-def list_public_vacancies(db: Session = Depends(get_db)):
-    q = db.query(Vacancy).filter(Vacancy.status == "approved")
-    return q.order_by(Vacancy.created_at.desc()).all()
+async def list_public_vacancies(
+    request: Request,
+    page: PageParams = Depends(),
+    seniority: str | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    # Served from the in-process board cache; the session only touches the DB on a miss
+    key = (page.limit, page.cursor, seniority)
+    cached = public_board.get(key)
+    if cached is None:
+        version = public_board.version
+        q = select(Vacancy).where(Vacancy.status == "approved")
+        if seniority:
+            q = q.where(Vacancy.seniority == seniority)
+        probe = Response()
+        rows = await paginate(db, q, Vacancy, page, probe)
+        cached = public_board.put(key, version, _public_page.dump_json(rows), probe.headers.get(NEXT_CURSOR_HEADER))
+    headers = {"ETag": cached.etag, "Last-Modified": cached.last_modified, "Cache-Control": "public, no-cache"}
+    if cached.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = cached.next_cursor
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 
 @router.get("/{vacancy_id}", response_model=schemas.VacancyPublic, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def get_vacancy(vacancy_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    v = db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
+async def get_vacancy(vacancy_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    v = await db.get(Vacancy, vacancy_id)
     if not v:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
     if current.role == RoleEnum.hr.value and v.owner_id != current.id:
@@ -55,30 +104,38 @@ def get_vacancy(vacancy_id: int, db: Session = Depends(get_db), current: User =
 
 
 @router.patch("/{vacancy_id}", response_model=schemas.VacancyPublic, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def update_vacancy(vacancy_id: int, payload: schemas.VacancyUpdate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    v = db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
-    if not v:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
-    if current.role == RoleEnum.hr.value and v.owner_id != current.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    for field in ["title", "description", "seniority", "skills", "weights", "status", "details"]:
-        val = getattr(payload, field)
-        if val is not None:
-            setattr(v, field, val)
-    db.add(v)
-    db.commit()
-    db.refresh(v)
+async def update_vacancy(vacancy_id: int, payload: schemas.VacancyUpdate, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    fields = ["title", "description", "seniority", "skills", "weights", "status", "details"]
+    values = {f: getattr(payload, f) for f in fields if getattr(payload, f) is not None}
+    v = await transition(db, Vacancy, vacancy_id, values, scope=_owned_by(current))
+    public_board.invalidate()
     return v
 
 
 @router.post("/upload", response_model=schemas.VacancyPublic, status_code=201, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-async def upload_vacancy(file: UploadFile = File(...), db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    # Read content and extract text using smart parser (PDF/DOCX/text)
-    raw_bytes = await file.read()
-    if not raw_bytes:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty file")
+async def upload_vacancy(file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    # Stream content to a temp file (size limit enforced while reading); the smart parser (PDF/DOCX/text) reads the path
+    try:
+        upload = await spool_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
 
-    text = extract_text_smart(raw_bytes, file.filename, file.content_type)
+    # Repeat uploads of the same brief reuse the extracted text and the parsed vacancy
+    try:
+        if not upload.size:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty file")
+        tver, pver = text_version(file.filename, file.content_type), parser_version("vacancy")
+        text, data = await extraction_cache.alookup(upload.digest, "vacancy", tver, pver)
+        fresh_text = text is None
+        if fresh_text:
+            try:
+                text = await extract_text_async(upload.path, file.filename, file.content_type)
+            except DocumentTooLarge as e:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+            except ExtractionError as e:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    finally:
+        upload.close()
     fname = (file.filename or "").lower()
     ctype = (file.content_type or "").lower()
     is_structured = fname.endswith((".pdf", ".docx")) or ("pdf" in ctype or "officedocument.wordprocessingml.document" in ctype)
@@ -86,19 +143,23 @@ async def upload_vacancy(file: UploadFile = File(...), db: Session = Depends(get
     if len((text or "").strip()) < (1 if is_structured else 5):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Файл распознан, но текста не найдено. Проверьте содержимое или загрузите DOCX/PDF с текстом")
 
-    data = None
     err: Exception | None = None
-    try:
-        client = PolzaClient()
-        data = client.extract_vacancy(text)
-    except Exception as e:
-        # As an extra guard, try fallback parser directly
+    parsed_by_llm = False
+    if data is None:
         try:
-            data = PolzaClient.extract_vacancy_fallback(text)
-        except Exception:
-            err = e
-    if not data:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"LLM parsing failed: {err}")
+            client = get_polza()
+            data = await client.extract_vacancy(text, fallback=False)
+            parsed_by_llm = True
+        except Exception as e:
+            # Rule-based fallback; its result is not cached so the LLM is tried again next time
+            try:
+                data = PolzaClient.extract_vacancy_fallback(text)
+            except Exception:
+                err = e
+        if not data:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"LLM parsing failed: {err}")
+    if fresh_text or parsed_by_llm:
+        await extraction_cache.astore(upload.digest, "vacancy", tver, text, upload.size, pver, data if parsed_by_llm else None)
 
     v = Vacancy(
         title=data["title"],
@@ -111,29 +172,21 @@ async def upload_vacancy(file: UploadFile = File(...), db: Session = Depends(get
         owner_id=current.id,
     )
     db.add(v)
-    db.commit()
-    db.refresh(v)
+    await db.commit()
+    public_board.invalidate()
+    await db.refresh(v)
     return v
 
 
 @router.post("/{vacancy_id}/approve", response_model=schemas.VacancyPublic, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def approve_vacancy(vacancy_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    v = db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
-    if not v:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
-    if current.role == RoleEnum.hr.value and v.owner_id != current.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    v.status = "approved"
-    db.add(v)
-    db.commit()
-    db.refresh(v)
+async def approve_vacancy(vacancy_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    v = await transition(db, Vacancy, vacancy_id, {"status": "approved"}, scope=_owned_by(current))
+    public_board.invalidate()
     return v
 
 
 @router.post("/generate", response_model=schemas.VacancyPublic, status_code=201, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def generate_vacancy(payload: schemas.VacancyBrief, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    from ..integrations.polza import PolzaClient
-
+async def generate_vacancy(payload: schemas.VacancyBrief, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
     title = payload.title or "Вакансия"
     seniority = payload.seniority or "Middle"
     highlights = payload.highlights or []
@@ -141,10 +194,10 @@ def generate_vacancy(payload: schemas.VacancyBrief, db: Session = Depends(get_db
 
     data = None
     try:
-        client = PolzaClient()
+        client = get_polza()
         # Reuse LLM with dedicated prompt
         brief_text = f"title: {title}\nseniority: {seniority}\nhighlights:\n- " + "\n- ".join(highlights)
-        data = client.generate_vacancy(brief_text)
+        data = await client.generate_vacancy(brief_text)
     except Exception:
         data = None
 
@@ -182,14 +235,15 @@ def generate_vacancy(payload: schemas.VacancyBrief, db: Session = Depends(get_db
         owner_id=current.id,
     )
     db.add(v)
-    db.commit()
-    db.refresh(v)
+    await db.commit()
+    public_board.invalidate()
+    await db.refresh(v)
     return v
 
 
 @router.delete("/{vacancy_id}", status_code=204, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def delete_vacancy(vacancy_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    v = db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
+async def delete_vacancy(vacancy_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    v = await db.get(Vacancy, vacancy_id)
     if not v:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
     # HR can delete only own drafts; Admin can delete any
@@ -198,53 +252,74 @@ def delete_vacancy(vacancy_id: int, db: Session = Depends(get_db), current: User
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
         if v.status != "draft":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Удалять можно только черновики")
-    db.delete(v)
-    db.commit()
+    await db.delete(v)
+    await db.commit()
+    public_board.invalidate()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post("/{vacancy_id}/archive", response_model=schemas.VacancyPublic, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def archive_vacancy(vacancy_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    v = db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
-    if not v:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+async def archive_vacancy(vacancy_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
     # HR can archive only own vacancies; Admin can archive any
-    if current.role == RoleEnum.hr.value and v.owner_id != current.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    v.status = "archived"
-    db.add(v)
-    db.commit()
-    db.refresh(v)
+    v = await transition(db, Vacancy, vacancy_id, {"status": "archived"}, scope=_owned_by(current))
+    public_board.invalidate()
     return v
 
 
 @router.post("/{vacancy_id}/unarchive", response_model=schemas.VacancyPublic, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def unarchive_vacancy(vacancy_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    v = db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
-    if not v:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
-    if current.role == RoleEnum.hr.value and v.owner_id != current.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    if v.status != "archived":
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Можно вернуть только из архива")
-    v.status = "draft"
-    db.add(v)
-    db.commit()
-    db.refresh(v)
+async def unarchive_vacancy(vacancy_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    v = await transition(
+        db, Vacancy, vacancy_id, {"status": "draft"},
+        scope=_owned_by(current), allowed_from=["archived"], status_error="Можно вернуть только из архива",
+    )
+    public_board.invalidate()
     return v
 
 
 @router.post("/{vacancy_id}/revoke", response_model=schemas.VacancyPublic, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
-def revoke_approval(vacancy_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    v = db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
+async def revoke_approval(vacancy_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    v = await transition(
+        db, Vacancy, vacancy_id, {"status": "draft"},
+        scope=_owned_by(current), allowed_from=["approved"], status_error="Отзывать можно только утверждённые",
+    )
+    public_board.invalidate()
+    return v
+
+
+@router.post("/{vacancy_id}/reassess", response_model=schemas.ReassessRunPublic, status_code=202, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
+async def reassess_vacancy(
+    vacancy_id: int,
+    background: BackgroundTasks,
+    concurrency: int = Query(REASSESS_CONCURRENCY, ge=1, le=REASSESS_MAX_CONCURRENCY),
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    v = await db.get(Vacancy, vacancy_id)
     if not v:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
     if current.role == RoleEnum.hr.value and v.owner_id != current.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    if v.status != "approved":
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Отзывать можно только утверждённые")
-    v.status = "draft"
-    db.add(v)
-    db.commit()
-    db.refresh(v)
-    return v
+    run = await db.run_sync(start_reassess_run, v.id, current.id, concurrency)
+    is_new = run.id is None
+    await db.commit()
+    await db.refresh(run)
+    # An already running pass for this vacancy is returned as-is instead of starting a second one
+    if is_new:
+        background.add_task(run_reassess, run.id, v.id, run.concurrency)
+    return run
+
+
+@router.get("/{vacancy_id}/reassess/{run_id}", response_model=schemas.ReassessRunPublic, dependencies=[Depends(require_role(RoleEnum.hr.value, RoleEnum.admin.value))])
+async def get_reassess_run(vacancy_id: int, run_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+    v = await db.get(Vacancy, vacancy_id)
+    if not v:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if current.role == RoleEnum.hr.value and v.owner_id != current.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    run = await db.scalar(select(ReassessRun).where(ReassessRun.id == run_id, ReassessRun.vacancy_id == v.id))
+    if not run:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if expire_stale_run(run):
+        await db.commit()
+        await db.refresh(run)
+    return run
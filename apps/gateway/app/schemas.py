@@ -150,8 +150,52 @@ class ApplicationPublic(BaseModel):
     match_score: float | None = None
     verdict: str | None = None
     notes: str | None = None
+    assessed_by: str | None = None
     profile_snapshot: dict
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class HrApplicationFeedItem(ApplicationPublic):
+    """Application row of the HR feed with the vacancy and candidate columns the dashboard shows."""
+    vacancy_title: str
+    vacancy_status: str
+    candidate_name: str
+    candidate_email: str
+
+
+# Assessment jobs
+class AssessmentJobPublic(BaseModel):
+    id: int
+    application_id: int
+    status: str
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    last_error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class ReassessRunPublic(BaseModel):
+    id: int
+    vacancy_id: int
+    status: str
+    concurrency: int
+    total: int
+    done: int
+    failed: int
+    llm_skipped: int = 0
+    last_error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,169 @@
+"""
+Vectorized heuristic scoring of all applicants of one vacancy.
+
+Same semantics as PolzaClient.assess_application_fallback (0.75 * skill coverage + 0.25 *
+description-term coverage, verdict thresholds 65/45), but applicants are encoded as sparse
+binary rows over the vacancy's own skill and term vocabularies and scored in one matrix pass.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from typing import Any, Dict
+
+import numpy as np
+from scipy import sparse
+
+from .config import SCREENING_TOP_K, SCREENING_MIN_SCORE
+
+
+_SPLIT = re.compile(r"[^\wа-яА-Я]+")
+_TOKEN = re.compile(r"[\wа-яА-Я]+")  # the pieces _SPLIT leaves, found without building the split list
+
+
+def _skills(values: Any) -> set[str]:
+    return {str(s).lower().strip() for s in (values or []) if str(s).strip()}
+
+
+def _terms(text: str) -> set[str]:
+    return {t for t in _SPLIT.split((text or "").lower()) if 2 <= len(t) <= 24}
+
+
+def verdict_for(score: float) -> str:
+    return "accept" if score >= 65 else "neutral" if score >= 45 else "reject"
+
+
+def _indicator(rows, vocab: Dict[str, int]) -> sparse.csr_matrix:
+    # One binary row per applicant over the vacancy vocabulary; terms outside it cannot match,
+    # so lookups double as the 2..24 length filter (the vocabulary only holds valid terms)
+    indptr = [0]
+    indices: list[int] = []
+    get = vocab.get
+    for row in rows:
+        hits = {get(t) for t in row}
+        hits.discard(None)
+        indices.extend(hits)
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float64)
+    return sparse.csr_matrix((data, np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)), shape=(len(indptr) - 1, len(vocab)))
+
+
+def score_applicants(vacancy: Dict[str, Any], profiles: list[Dict[str, Any]]) -> np.ndarray:
+    """Fallback match scores (0..100, unrounded) for each profile, in input order."""
+    vskills = _skills(vacancy.get("skills"))
+    vterms = _terms(vacancy.get("description") or "")
+    skill_vocab = {s: i for i, s in enumerate(sorted(vskills))}
+    term_vocab = {t: i for i, t in enumerate(sorted(vterms))}
+
+    S = _indicator((_skills(p.get("skills")) for p in profiles), skill_vocab)
+    D = _indicator((_TOKEN.findall((p.get("summary") or "").lower()) for p in profiles), term_vocab)
+    # Coverage of the vacancy vectors: (applicants x vocab) @ (vocab,) ones
+    sscore = (S @ np.ones(len(skill_vocab))) / max(1, len(skill_vocab))
+    dscore = (D @ np.ones(len(term_vocab))) / max(1, len(term_vocab))
+    scores = 100.0 * (0.75 * sscore + 0.25 * dscore)
+    return np.clip(scores, 0.0, 100.0)
+
+
+def _notes(vskills: set[str], profile: Dict[str, Any]) -> str:
+    overlap = vskills.intersection(_skills(profile.get("skills")))
+    missing = sorted(vskills - overlap)[:6]
+    notes = "Совпадения по навыкам: " + (", ".join(sorted(overlap)) or "нет")
+    if missing:
+        notes += "; Недостаёт: " + ", ".join(missing)
+    return notes
+
+
+def rank_shortlist(
+    vacancy: Dict[str, Any],
+    applicants: list[tuple[int, Dict[str, Any]]],
+    top_k: int | None = None,
+    min_score: float | None = None,
+) -> list[Dict[str, Any]]:
+    """
+    Rank (application_id, profile) pairs by fallback score, best first.
+    Returns [{application_id, match_score, verdict, notes}] cut to top_k and/or min_score;
+    notes are only built for the returned rows.
+    """
+    if not applicants:
+        return []
+    scores = score_applicants(vacancy, [p for _, p in applicants])
+    # Stable sort keeps input order (e.g. application id) among equal scores
+    order = np.argsort(-scores, kind="stable")
+    if min_score is not None:
+        order = order[scores[order] >= min_score]
+    if top_k is not None:
+        order = order[:top_k]
+    vskills = _skills(vacancy.get("skills"))
+    out = []
+    for i in order:
+        aid, prof = applicants[int(i)]
+        score = float(scores[i])
+        out.append({"application_id": aid, "match_score": round(score, 2), "verdict": verdict_for(score), "notes": _notes(vskills, prof)})
+    return out
+
+
+# --- Two-stage screening: heuristic prefilter first, LLM only for the best applicants ---
+PREFILTER_NOTE = "Предварительный отбор (без LLM). "
+
+_stats_lock = threading.Lock()
+screening_stats: Dict[str, int] = {"llm_assessed": 0, "llm_skipped": 0}
+
+
+def count_screening(llm_assessed: int = 0, llm_skipped: int = 0) -> None:
+    with _stats_lock:
+        screening_stats["llm_assessed"] += llm_assessed
+        screening_stats["llm_skipped"] += llm_skipped
+
+
+def _num(val: Any, cast):
+    try:
+        return cast(val) if val not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def screening_settings(details: Dict[str, Any] | None) -> Dict[str, Any]:
+    """
+    Per-vacancy settings from details["screening"] = {"llm_top_k": int, "prefilter_min_score": float},
+    falling back to SCREENING_TOP_K / SCREENING_MIN_SCORE. Zero/empty disables a criterion.
+    """
+    conf = (details or {}).get("screening") or {}
+    if not isinstance(conf, dict):
+        conf = {}
+    top_k = _num(conf.get("llm_top_k"), int)
+    min_score = _num(conf.get("prefilter_min_score"), float)
+    if top_k is None:
+        top_k = SCREENING_TOP_K
+    if min_score is None:
+        min_score = SCREENING_MIN_SCORE
+    return {"top_k": top_k or None, "min_score": min_score or None}
+
+
+def screening_enabled(settings: Dict[str, Any]) -> bool:
+    return settings["top_k"] is not None or settings["min_score"] is not None
+
+
+def select_for_llm(scored: list[tuple[int, float]], top_k: int | None, min_score: float | None) -> set[int]:
+    """Application ids that pass the prefilter: score >= min_score, then the best top_k of those."""
+    if not scored:
+        return set()
+    ids = np.asarray([aid for aid, _ in scored])
+    scores = np.asarray([s for _, s in scored], dtype=np.float64)
+    order = np.argsort(-scores, kind="stable")
+    if min_score is not None:
+        order = order[scores[order] >= min_score]
+    if top_k is not None:
+        order = order[:top_k]
+    return {int(i) for i in ids[order]}
+
+
+def prefilter_results(vacancy: Dict[str, Any], applicants: list[tuple[int, Dict[str, Any]]]) -> Dict[int, Dict[str, Any]]:
+    """Heuristic assessments for applicants that do not go to the LLM, marked as such in notes."""
+    out = {}
+    for row in rank_shortlist(vacancy, applicants):
+        out[row["application_id"]] = {
+            "match_score": row["match_score"],
+            "verdict": row["verdict"],
+            "notes": PREFILTER_NOTE + row["notes"],
+        }
+    return out
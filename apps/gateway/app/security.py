@@ -1,42 +1,42 @@
 from datetime import datetime, timedelta, timezone
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .config import JWT_ALG, JWT_SECRET, ACCESS_TOKEN_MIN, REFRESH_TOKEN_DAYS
-from .db import SessionLocal
+from .config import JWT_ALG, JWT_SECRET, ACCESS_TOKEN_MIN, REFRESH_TOKEN_DAYS, DB_ASYNC
+from .db import SessionLocal, AsyncSessionLocal, SyncSessionAdapter
 from .models import User
+from .user_cache import user_cache
+from .utils.passwords import hash_password, verify_password  # noqa: F401 - re-exported for scripts
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
-def get_db() -> Session:
-    db = SessionLocal()
+async def get_db() -> AsyncIterator[AsyncSession]:
+    # Same AsyncSession API in both modes; DB_ASYNC=0 runs each call on the sync engine in the threadpool
+    if DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    db = SyncSessionAdapter(SessionLocal(expire_on_commit=False))
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(password: str, password_hash: str) -> bool:
-    return pwd_context.verify(password, password_hash)
-
-
-def create_token(sub: str, role: str, expires_delta: timedelta) -> str:
+def create_token(user: User, expires_delta: timedelta) -> str:
     now = datetime.now(tz=timezone.utc)
     payload = {
-        "sub": sub,
-        "role": role,
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role,
+        "tv": user.token_version or 0,
         "iat": int(now.timestamp()),
         "exp": int((now + expires_delta).timestamp()),
         "type": "access" if expires_delta <= timedelta(minutes=ACCESS_TOKEN_MIN) else "refresh",
@@ -45,8 +45,8 @@ def create_token(sub: str, role: str, expires_delta: timedelta) -> str:
 
 
 def create_access_refresh(user: User) -> tuple[str, str]:
-    access = create_token(user.email, user.role, timedelta(minutes=ACCESS_TOKEN_MIN))
-    refresh = create_token(user.email, user.role, timedelta(days=REFRESH_TOKEN_DAYS))
+    access = create_token(user, timedelta(minutes=ACCESS_TOKEN_MIN))
+    refresh = create_token(user, timedelta(days=REFRESH_TOKEN_DAYS))
     return access, refresh
 
 
@@ -59,25 +59,47 @@ def decode_token(token: str) -> dict:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from e
 
 
-def get_current_user(
+async def get_current_user(
     credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(bearer_scheme)],
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_db)],
 ) -> User:
     if credentials is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
     payload = decode_token(credentials.credentials)
-    email = payload.get("sub")
-    if not email:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return await user_from_token(payload, db)
+
+
+async def user_from_token(payload: dict, db: AsyncSession) -> User:
+    """
+    The user a decoded token belongs to, checked against its token version.
+    Tokens with a `uid` claim are served from the in-process user cache; older tokens fall back to the email.
+    """
+    uid = payload.get("uid")
+    user = user_cache.get(uid) if uid is not None else None
+    if user is None:
+        if uid is not None:
+            user = await db.get(User, uid)
+        elif payload.get("sub"):
+            user = await db.scalar(select(User).where(User.email == payload["sub"]))
+        else:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        # Detached: the cached instance is shared read-only across requests
+        db.expunge(user)
+        # End the read transaction so the pooled connection is not held while the handler waits on
+        # uploads or the LLM; the next query starts a new one (objects are not expired on commit)
+        await db.commit()
+        user_cache.put(user)
+    if payload.get("tv", 0) != (user.token_version or 0):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
     return user
 
 
 def require_role(*roles: str):
-    def _dep(user: Annotated[User, Depends(get_current_user)]) -> User:
+    # get_current_user is cached per request by FastAPI, so routes that also take `current` resolve the user once
+    async def _dep(user: Annotated[User, Depends(get_current_user)]) -> User:
         if user.role not in roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
         return user
@@ -0,0 +1,169 @@
+"""
+OpenTelemetry tracing, off unless TRACING_ENABLED=1 (the opentelemetry packages are only imported then).
+
+setup_tracing() installs the tracer provider and the exporter, instruments FastAPI (one span per route) and the
+SQLAlchemy engines (one span per statement, via engine events: opentelemetry-instrumentation-sqlalchemy does not
+support SQLAlchemy 2.1), and adds a span per Session commit. Application code marks its own
+units of work with span() and @traced(), which cost a None check while tracing is off:
+Polza calls (integrations/polza.py), text extraction (utils/text_extract.py), background assessment jobs.
+
+TRACING_EXPORTER=memory keeps finished spans in `memory_exporter` (an InMemorySpanExporter) for tests and local
+runs: `memory_exporter.get_finished_spans()`.
+"""
+from __future__ import annotations
+
+import functools
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import TRACING_ENABLED, TRACING_EXPORTER, TRACING_SERVICE_NAME
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_tracer = None
+_provider = None
+memory_exporter = None
+
+
+def _exporter_processor():
+    global memory_exporter
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+
+    if TRACING_EXPORTER == "memory":
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        memory_exporter = InMemorySpanExporter()
+        return SimpleSpanProcessor(memory_exporter)
+    if TRACING_EXPORTER == "console":
+        return SimpleSpanProcessor(ConsoleSpanExporter())
+    # Endpoint, headers and timeout come from OTEL_EXPORTER_OTLP_* (default http://localhost:4318)
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    return BatchSpanProcessor(OTLPSpanExporter())
+
+
+def setup_tracing(app=None) -> None:
+    """Idempotent; call before the app starts serving (FastAPI instrumentation adds a middleware)."""
+    global _tracer, _provider
+    if not TRACING_ENABLED:
+        return
+    if _tracer is None:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+
+        from .db import async_engine, engine
+
+        # The sampler follows OTEL_TRACES_SAMPLER / OTEL_TRACES_SAMPLER_ARG (default: parent-based, always on)
+        _provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+        _provider.add_span_processor(_exporter_processor())
+        trace.set_tracer_provider(_provider)
+        _tracer = trace.get_tracer("hr-gateway")
+        for eng in [engine] + ([async_engine.sync_engine] if async_engine is not None else []):
+            event.listen(eng, "before_cursor_execute", _start_statement_span)
+            event.listen(eng, "after_cursor_execute", _end_statement_span)
+            event.listen(eng, "handle_error", _fail_statement_span)
+        event.listen(Session, "before_commit", _start_commit_span)
+        event.listen(Session, "after_commit", _end_commit_span)
+        event.listen(Session, "after_rollback", _fail_commit_span)
+    if app is not None and not getattr(app.state, "tracing", False):
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+        # Per-message "http send/receive" spans add nothing here; scrapes and probes are not traced
+        FastAPIInstrumentor.instrument_app(
+            app, tracer_provider=_provider, excluded_urls="/metrics,/health", exclude_spans=["send", "receive"],
+        )
+        app.state.tracing = True
+
+
+def shutdown_tracing() -> None:
+    """Flush spans still queued for export."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Child span of the current one (None while tracing is off); None-valued attributes are skipped."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes={k: v for k, v in attributes.items() if v is not None}) as s:
+        yield s
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator form of span() for sync functions."""
+    def wrap(fn: F) -> F:
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _tracer.start_as_current_span(name):
+                return fn(*args, **kwargs)
+        return inner  # type: ignore[return-value]
+    return wrap
+
+
+def set_attributes(s: Any, **attributes: Any) -> None:
+    """Set attributes on a span yielded by span(); no-op for None (tracing off)."""
+    if s is not None:
+        s.set_attributes({k: v for k, v in attributes.items() if v is not None})
+
+
+# --- Statement spans: SQL text with placeholders, never the bound parameters ---
+def _start_statement_span(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _tracer is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    s = _tracer.start_span(operation, attributes={
+        "db.system": conn.dialect.name,
+        "db.operation": operation,
+        "db.statement": statement,
+        "db.executemany": executemany,
+    })
+    conn.info.setdefault("statement_spans", []).append(s)
+
+
+def _end_statement_span(conn, cursor, statement, parameters, context, executemany) -> None:
+    spans = conn.info.get("statement_spans")
+    if spans:
+        spans.pop().end()
+
+
+def _fail_statement_span(exception_context) -> None:
+    conn = exception_context.connection
+    spans = conn.info.get("statement_spans") if conn is not None else None
+    if spans:
+        from opentelemetry.trace import Status, StatusCode
+
+        s = spans.pop()
+        s.record_exception(exception_context.original_exception)
+        s.set_status(Status(StatusCode.ERROR, type(exception_context.original_exception).__name__))
+        s.end()
+
+
+# --- Commit spans: flush + COMMIT, which the per-statement instrumentation does not cover as a whole ---
+def _start_commit_span(session: Session) -> None:
+    if _tracer is not None:
+        session.info["commit_span"] = _tracer.start_span("db.commit")
+
+
+def _end_commit_span(session: Session) -> None:
+    s = session.info.pop("commit_span", None)
+    if s is not None:
+        s.end()
+
+
+def _fail_commit_span(session: Session) -> None:
+    # A commit that failed (flush error, serialization failure) ends in a rollback
+    s = session.info.pop("commit_span", None)
+    if s is not None:
+        from opentelemetry.trace import Status, StatusCode
+
+        s.set_status(Status(StatusCode.ERROR, "rolled back"))
+        s.end()
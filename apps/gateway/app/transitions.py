@@ -0,0 +1,60 @@
+"""
+Guarded state changes as one conditional UPDATE ... RETURNING.
+
+The ownership scope and the allowed source statuses go into the WHERE clause, so the check and the write are
+a single statement with no read-modify-write window. Only when no row matches is a second query made, to
+tell 404 (no such row) from 403 (not in the caller's scope) from 400 (wrong status).
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, TypeVar
+
+from fastapi import HTTPException, status
+from sqlalchemy import ColumnElement, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+T = TypeVar("T")
+
+
+async def _raise_for_miss(db: AsyncSession, model: Any, id_: int, scope: ColumnElement | None, allowed_from: Iterable[str] | None, status_error: str) -> None:
+    row = (await db.execute(select(model.status, scope if scope is not None else true()).where(model.id == id_))).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if not row[1]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    if allowed_from is not None and row[0] not in allowed_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=status_error)
+    # Matched on the second look: the row changed between the two statements
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Conflict, retry")
+
+
+async def transition(
+    db: AsyncSession,
+    model: type[T],
+    id_: int,
+    values: dict[str, Any],
+    *,
+    scope: ColumnElement | None = None,
+    allowed_from: Iterable[str] | None = None,
+    status_error: str = "Недопустимый статус",
+) -> T:
+    """
+    UPDATE model SET values WHERE id = id_ AND scope AND status IN allowed_from RETURNING *, then commit.
+    `scope` is the ownership condition (None: any row, e.g. for admins). Returns the updated object.
+    """
+    allowed = tuple(allowed_from) if allowed_from is not None else None
+    conds = [model.id == id_]
+    if scope is not None:
+        conds.append(scope)
+    if allowed is not None:
+        conds.append(model.status.in_(allowed))
+    if values:
+        stmt = update(model).where(*conds).values(values).returning(model).execution_options(populate_existing=True)
+    else:
+        stmt = select(model).where(*conds)
+    obj = await db.scalar(stmt)
+    if obj is None:
+        await _raise_for_miss(db, model, id_, scope, allowed, status_error)
+    await db.commit()
+    return obj
@@ -0,0 +1,91 @@
+"""
+Short-TTL in-process cache of authenticated users, keyed by user id (the `uid` claim of access tokens).
+
+Cached users are detached from any session and read-only for handlers. Changes to users made through the ORM
+in this process evict the entry after commit; USER_CACHE_TTL bounds staleness for changes made elsewhere.
+Changing a user's role or password also bumps token_version, which revokes the tokens issued before.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .config import USER_CACHE_ENABLED, USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL
+from .models import User
+
+
+class UserCache:
+    def __init__(self, max_entries: int, ttl: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._users: OrderedDict[int, tuple[float, User]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, user_id: int) -> User | None:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._users.get(user_id)
+            if item is None or item[0] < now:
+                self._users.pop(user_id, None)
+                self._stats["misses"] += 1
+                return None
+            self._users.move_to_end(user_id)
+            self._stats["hits"] += 1
+            return item[1]
+
+    def put(self, user: User) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._users[user.id] = (time.monotonic() + self.ttl, user)
+            self._users.move_to_end(user.id)
+            while len(self._users) > self.max_entries:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        """Drop one user (or all of them)."""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"enabled": self.enabled, "entries": len(self._users), **self._stats}
+
+
+user_cache = UserCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL, enabled=USER_CACHE_ENABLED)
+
+
+# --- invalidation: every Session (sync, or the one behind an AsyncSession) reports the users it changed ---
+@event.listens_for(Session, "before_flush")
+def _track_user_changes(session: Session, flush_context, instances) -> None:
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, User):
+            continue
+        state = inspect(obj)
+        if obj in session.dirty and any(state.attrs[f].history.has_changes() for f in ("role", "password_hash")):
+            obj.token_version = (obj.token_version or 0) + 1
+        session.info.setdefault("changed_user_ids", set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_changed_users(session: Session) -> None:
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop("changed_user_ids", None)
@@ -0,0 +1,97 @@
+"""
+Password hashing off the request path: bcrypt runs in a small dedicated process pool with a bounded backlog,
+so a login burst saturates PASSWORD_WORKERS cores instead of the threadpool every other endpoint shares.
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from ..config import BCRYPT_ROUNDS, PASSWORD_WORKERS, PASSWORD_QUEUE_MAX
+
+
+# Hashes with other rounds (or deprecated schemes) verify fine and are flagged for a rehash
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class PasswordPoolBusy(RuntimeError):
+    """More hashing work is pending than PASSWORD_WORKERS + PASSWORD_QUEUE_MAX."""
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return pwd_context.verify(password, password_hash)
+
+
+def verify_and_update(password: str, password_hash: str) -> tuple[bool, Optional[str]]:
+    """(matches, new hash when the stored one uses outdated cost parameters, else None)."""
+    return pwd_context.verify_and_update(password, password_hash)
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_pending = 0
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, like the extraction pool: the parent runs threads that fork would copy mid-state
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool(broken: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_password_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run(fn, *args):
+    """fn(*args) on the password pool (threadpool when PASSWORD_WORKERS=0); PasswordPoolBusy past the backlog."""
+    global _pending
+    if PASSWORD_QUEUE_MAX and _pending >= max(1, PASSWORD_WORKERS) + PASSWORD_QUEUE_MAX:
+        raise PasswordPoolBusy("Too many authentication requests, retry shortly")
+    _pending += 1
+    try:
+        if PASSWORD_WORKERS <= 0:
+            return await run_in_threadpool(fn, *args)
+        pool = _get_pool()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            # A worker died: start a fresh pool next time
+            _reset_pool(pool)
+            raise
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+
+async def verify_and_update_async(password: str, password_hash: str) -> tuple[bool, Optional[str]]:
+    return await _run(verify_and_update, password, password_hash)
+
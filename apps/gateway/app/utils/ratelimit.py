@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.requests import Request
+
+from ..config import TRUSTED_PROXIES
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets: `burst` tokens, refilled at `rate_per_min` per minute.
+    In-process; the least recently seen keys are dropped past max_keys (a dropped key starts with a full bucket).
+    """
+
+    def __init__(self, rate_per_min: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str) -> float:
+        """Spend a token; returns 0 when allowed, else the seconds until the next token."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - stamp) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+_trusted = [ipaddress.ip_network(p, strict=False) for p in TRUSTED_PROXIES]
+
+
+def _is_trusted(host: str) -> bool:
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(addr in net for net in _trusted)
+
+
+def client_ip(request: Request) -> str:
+    """
+    The client address for rate limiting. When the peer is a trusted proxy, X-Forwarded-For is read right to
+    left, skipping trusted hops; the first other address is the client (entries left of it can be forged).
+    """
+    peer = request.client.host if request.client else "-"
+    if not _trusted or not _is_trusted(peer):
+        return peer
+    hops = [h.strip() for h in ",".join(request.headers.getlist("x-forwarded-for")).split(",") if h.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop):
+            return hop
+    return hops[0] if hops else peer
@@ -1,34 +1,105 @@
 from __future__ import annotations
 
-from io import BytesIO
-from typing import Optional
+import asyncio
+import mmap
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from io import BytesIO, StringIO
+from typing import BinaryIO, Optional, Union
 
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore
 
-def _decode_best_effort(b: bytes) -> str:
+from ..config import (
+    EXTRACT_WORKERS,
+    EXTRACT_MAX_PAGES,
+    EXTRACT_CPU_SECONDS,
+    EXTRACT_TIMEOUT,
+    EXTRACT_PDF_PARALLEL,
+    EXTRACT_PDF_CHUNK_PAGES,
+    EXTRACT_PAGE_BUDGET,
+    EXTRACT_CHAR_BUDGET,
+)
+from ..metrics import EXTRACT_SECONDS
+from ..tracing import set_attributes, span, traced
+
+
+class ExtractionError(ValueError):
+    """Document was rejected by the extraction limits; the message is safe to show to the client."""
+
+
+class DocumentTooLarge(ExtractionError):
+    pass
+
+
+class ExtractionTimeout(ExtractionError):
+    pass
+
+
+# Document content: raw bytes or a path to a (spooled) file. Paths are read lazily by the parsers,
+# so a large upload is never held in memory as a whole.
+Source = Union[bytes, str, os.PathLike]
+
+
+def _open_source(source: Source) -> BinaryIO:
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    return open(source, "rb")
+
+
+def _decode_best_effort(b) -> str:
+    # str(buffer, enc) decodes any bytes-like object (bytes, mmap) without copying it first
     for enc in ("utf-8", "cp1251", "latin-1"):
         try:
-            return b.decode(enc)
+            return str(b, enc)
         except UnicodeDecodeError:
             continue
-    return b.decode("utf-8", errors="ignore")
+    return str(b, "utf-8", errors="ignore")
 
 
-def extract_text_from_pdf(raw: bytes) -> str:
+def _decode_source(source: Source) -> str:
+    if isinstance(source, (bytes, bytearray)):
+        return _decode_best_effort(source)
+    with open(source, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _decode_best_effort(mm)
+
+
+@traced("text_extract.pdf")
+def extract_text_from_pdf(source: Source, max_pages: int = 0) -> str:
     try:
         from pdfminer.high_level import extract_text  # type: ignore
+        from pdfminer.pdfpage import PDFPage  # type: ignore
     except Exception as e:  # pragma: no cover
         raise RuntimeError("pdfminer.six is not installed") from e
-    bio = BytesIO(raw)
-    return extract_text(bio) or ""
+    with _open_source(source) as fp:
+        if max_pages:
+            # Page objects only (no layout analysis), stopping right after the limit
+            pages = sum(1 for _ in PDFPage.get_pages(fp, maxpages=max_pages + 1))
+            if pages > max_pages:
+                raise DocumentTooLarge(f"PDF has more than {max_pages} pages")
+            fp.seek(0)
+        return extract_text(fp, maxpages=max_pages) or ""
 
 
-def extract_text_from_docx(raw: bytes) -> str:
+@traced("text_extract.docx")
+def extract_text_from_docx(source: Source) -> str:
     try:
         from docx import Document  # type: ignore
     except Exception as e:  # pragma: no cover
         raise RuntimeError("python-docx is not installed") from e
-    bio = BytesIO(raw)
-    doc = Document(bio)
+    with _open_source(source) as fp:
+        doc = Document(fp)
     parts: list[str] = []
     # Paragraphs
     for p in doc.paragraphs:
@@ -48,17 +119,264 @@ def extract_text_from_docx(raw: bytes) -> str:
     return "\n".join(parts)
 
 
-def extract_text_smart(raw: bytes, filename: Optional[str], content_type: Optional[str]) -> str:
+# Bump when extraction output changes for the same bytes (parser upgrade, new cleanup step)
+TEXT_EXTRACT_VERSION = "1"
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
     name = (filename or "").lower()
     ctype = (content_type or "").lower()
+    if name.endswith(".pdf") or "pdf" in ctype:
+        return "pdf"
+    if name.endswith(".docx") or "officedocument.wordprocessingml.document" in ctype:
+        return "docx"
+    return "text"
+
+
+def text_version(filename: Optional[str], content_type: Optional[str]) -> str:
+    """Identifies what extract_text_async would produce for these bytes: extractor version, format, limits."""
+    fmt = detect_format(filename, content_type)
+    version = f"{TEXT_EXTRACT_VERSION}:{fmt}:{EXTRACT_MAX_PAGES}"
+    if fmt == "pdf" and EXTRACT_PDF_PARALLEL and EXTRACT_WORKERS > 0:
+        version += f":{EXTRACT_PAGE_BUDGET}:{EXTRACT_CHAR_BUDGET}"
+    return version
+
+
+@traced("text_extract.smart")
+def extract_text_smart(source: Source, filename: Optional[str], content_type: Optional[str], max_pages: int = 0) -> str:
+    fmt = detect_format(filename, content_type)
 
     try:
-        if name.endswith(".pdf") or "pdf" in ctype:
-            return extract_text_from_pdf(raw)
-        if name.endswith(".docx") or "officedocument.wordprocessingml.document" in ctype:
-            return extract_text_from_docx(raw)
+        if fmt == "pdf":
+            return extract_text_from_pdf(source, max_pages)
+        if fmt == "docx":
+            return extract_text_from_docx(source)
+    except ExtractionError:
+        raise
     except Exception:
         # Fall back to best-effort decoding if specific parser fails
         pass
 
-    return _decode_best_effort(raw)
+    return _decode_source(source)
+
+
+# --- Process pool: parsing is CPU-bound pure Python and must not run on the event loop ---
+def _on_cpu_limit(signum, frame):
+    raise ExtractionTimeout("Document processing exceeded the CPU time limit")
+
+
+def _init_worker() -> None:
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+
+def _set_cpu_soft_limit(seconds: int | None) -> None:
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    # RLIMIT_CPU counts the whole process lifetime: the budget starts from what this worker already used
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _limited(cpu_seconds: int, fn, *args):
+    # Runs in a pool worker: fn(*args) under a CPU time budget
+    _set_cpu_soft_limit(cpu_seconds or None)
+    try:
+        return fn(*args)
+    finally:
+        _set_cpu_soft_limit(None)
+
+
+def _metered(fn, *args):
+    # Runs in a pool worker: fn(*args) and the CPU seconds it used
+    t0 = time.process_time()
+    return fn(*args), time.process_time() - t0
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the parent runs threads (assessment workers, event loop) that fork would copy mid-state
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _reset_pool(broken: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_extract_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _in_pool(pool: ProcessPoolExecutor, deadline: float, fn, *args, cpu_seconds: int = EXTRACT_CPU_SECONDS):
+    """Await fn(*args) on the pool under cpu_seconds of CPU time and the shared wall-clock deadline (loop time)."""
+    loop = asyncio.get_running_loop()
+    fut = loop.run_in_executor(pool, _limited, cpu_seconds, fn, *args)
+    try:
+        return await asyncio.wait_for(fut, max(0.0, deadline - loop.time()))
+    except asyncio.TimeoutError:
+        raise ExtractionTimeout("Document processing took too long") from None
+    except BrokenProcessPool:
+        # A worker died (e.g. hit the hard CPU limit or ran out of memory): start a fresh pool next time
+        _reset_pool(pool)
+        raise ExtractionError("Document could not be processed") from None
+
+
+# --- Page-parallel PDF extraction: page ranges on several workers, in order, with an early cut-off ---
+def pdf_page_count(source: Source, max_pages: int = 0) -> int:
+    try:
+        from pdfminer.pdfpage import PDFPage  # type: ignore
+    except Exception as e:  # pragma: no cover
+        raise RuntimeError("pdfminer.six is not installed") from e
+    with _open_source(source) as fp:
+        pages = sum(1 for _ in PDFPage.get_pages(fp, maxpages=max_pages + 1 if max_pages else 0))
+    if max_pages and pages > max_pages:
+        raise DocumentTooLarge(f"PDF has more than {max_pages} pages")
+    return pages
+
+
+def pdf_page_texts(source: Source, start: int, stop: int) -> list[str]:
+    """Text of pages [start, stop), one string per page, laid out like pdfminer's extract_text."""
+    try:
+        from pdfminer.converter import TextConverter  # type: ignore
+        from pdfminer.layout import LAParams  # type: ignore
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager  # type: ignore
+        from pdfminer.pdfpage import PDFPage  # type: ignore
+    except Exception as e:  # pragma: no cover
+        raise RuntimeError("pdfminer.six is not installed") from e
+    texts: list[str] = []
+    rsrc = PDFResourceManager(caching=True)
+    with _open_source(source) as fp:
+        for page in PDFPage.get_pages(fp, pagenos=set(range(start, stop)), maxpages=stop):
+            buf = StringIO()
+            device = TextConverter(rsrc, buf, laparams=LAParams())
+            PDFPageInterpreter(rsrc, device).process_page(page)
+            device.close()
+            texts.append(buf.getvalue())
+    return texts
+
+
+async def stream_pdf_pages(
+    path: Union[str, os.PathLike],
+    *,
+    max_pages: int = EXTRACT_MAX_PAGES,
+    page_budget: int = EXTRACT_PAGE_BUDGET,
+    char_budget: int = EXTRACT_CHAR_BUDGET,
+    chunk_pages: int = EXTRACT_PDF_CHUNK_PAGES,
+):
+    """
+    Yield page texts in order as soon as they are ready. Ranges of chunk_pages pages run on up to
+    EXTRACT_WORKERS processes at once; nothing past page_budget pages is read, and the stream ends
+    (pending ranges cancelled) once char_budget characters were yielded. 0 disables a budget.
+    EXTRACT_CPU_SECONDS caps the whole document: each range gets a share of what is left, and
+    ExtractionTimeout is raised once less than a second remains for the pages still to read.
+    """
+    pool = _get_pool()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + EXTRACT_TIMEOUT
+    total, spent = await _in_pool(pool, deadline, _metered, pdf_page_count, path, max_pages)
+    last = min(total, page_budget) if page_budget else total
+    todo = deque((start, min(start + max(1, chunk_pages), last)) for start in range(0, last, max(1, chunk_pages)))
+    slots = max(1, EXTRACT_WORKERS)
+    # (task, CPU seconds reserved for it); the shares of running ranges plus spent never exceed the budget
+    pending: deque[tuple[asyncio.Task, int]] = deque()
+
+    def fill() -> None:
+        while todo and len(pending) < slots:
+            cpu = 0
+            if EXTRACT_CPU_SECONDS:
+                # RLIMIT_CPU has whole-second resolution: an equal split of the unreserved rest over the free slots
+                unreserved = EXTRACT_CPU_SECONDS - spent - sum(share for _, share in pending)
+                cpu = int(unreserved // (slots - len(pending)))
+                if cpu < 1:
+                    if pending:
+                        return  # a running range hands back its unused share when it finishes
+                    cpu = int(unreserved)  # alone: the whole rest
+                    if cpu < 1:
+                        raise ExtractionTimeout("Document processing exceeded the CPU time limit")
+            start, stop = todo.popleft()
+            task = asyncio.ensure_future(_in_pool(pool, deadline, _metered, pdf_page_texts, path, start, stop, cpu_seconds=cpu))
+            pending.append((task, cpu))
+
+    fill()
+    chars = 0
+    try:
+        while pending:
+            texts, used = await pending[0][0]
+            pending.popleft()
+            spent += used
+            fill()
+            for text in texts:
+                yield text
+                chars += len(text)
+                if char_budget and chars >= char_budget:
+                    return
+    finally:
+        for task, _ in pending:
+            task.cancel()
+
+
+async def extract_text_async(source: Source, filename: Optional[str], content_type: Optional[str]) -> str:
+    """
+    extract_text_smart in a bounded process pool (EXTRACT_WORKERS) with a page limit, a per-document
+    CPU time limit and a wall-clock timeout. Raises ExtractionError subclasses for rejected documents.
+    Pass a file path for uploads: only the path crosses the process boundary, not the content,
+    and PDFs are then read page-parallel within EXTRACT_PAGE_BUDGET / EXTRACT_CHAR_BUDGET.
+    """
+    fmt = detect_format(filename, content_type)
+    outcome = "error"
+    t0 = time.perf_counter()
+    try:
+        # Spans of the parsers themselves exist only with EXTRACT_WORKERS=0: pool workers do not trace
+        with span("text_extract", **{"text_extract.format": fmt, "text_extract.workers": EXTRACT_WORKERS}) as sp:
+            text = await _extract_text_async(source, fmt, filename, content_type)
+            set_attributes(sp, **{"text_extract.chars": len(text)})
+        outcome = "ok"
+        return text
+    except ExtractionError:
+        outcome = "rejected"
+        raise
+    finally:
+        EXTRACT_SECONDS.labels(fmt, outcome).observe(time.perf_counter() - t0)
+
+
+async def _extract_text_async(source: Source, fmt: str, filename: Optional[str], content_type: Optional[str]) -> str:
+    if EXTRACT_WORKERS <= 0:
+        return await asyncio.to_thread(extract_text_smart, source, filename, content_type, EXTRACT_MAX_PAGES)
+    if EXTRACT_PDF_PARALLEL and not isinstance(source, (bytes, bytearray)) and fmt == "pdf":
+        try:
+            return "".join([text async for text in stream_pdf_pages(source)])
+        except ExtractionError:
+            raise
+        except Exception:
+            # Not a parseable PDF: the serial path falls back to best-effort decoding
+            pass
+    loop = asyncio.get_running_loop()
+    return await _in_pool(
+        _get_pool(), loop.time() + EXTRACT_TIMEOUT, extract_text_smart, source, filename, content_type, EXTRACT_MAX_PAGES
+    )
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from fastapi import UploadFile
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import UPLOAD_MAX_BYTES, UPLOAD_CHUNK_SIZE, UPLOAD_FORM_OVERHEAD, UPLOAD_TMP_DIR
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class SpooledUpload:
+    """An upload copied to a temp file on disk, with its size and sha256 computed on the way."""
+
+    def __init__(self, path: str, size: int, digest: str, filename: Optional[str], content_type: Optional[str]):
+        self.path = path
+        self.size = size
+        self.digest = digest
+        self.filename = filename
+        self.content_type = content_type
+
+    def close(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """
+    Stream an UploadFile to disk in UPLOAD_CHUNK_SIZE chunks, so memory per upload stays at one chunk.
+    Raises UploadTooLarge as soon as more than max_bytes have been read. The caller must close() the result.
+    The request body itself is capped before form parsing by UploadLimitMiddleware; this is the exact per-file check.
+    """
+    if max_bytes and file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(f"File is larger than {max_bytes // (1024 * 1024)} MB")
+    h = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=UPLOAD_TMP_DIR or None)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge(f"File is larger than {max_bytes // (1024 * 1024)} MB")
+                h.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledUpload(path, size, h.hexdigest(), file.filename, file.content_type)
+
+
+class UploadLimitMiddleware:
+    """
+    Pure ASGI middleware capping multipart request bodies before Starlette's form parser buffers them:
+    413 straight away when Content-Length is over the limit, otherwise as soon as the received bytes cross it
+    (the app then sees a client disconnect and its own response is dropped).
+    """
+
+    def __init__(self, app: ASGIApp, max_body: int = UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD):
+        self.app = app
+        self.max_body = max_body
+
+    @staticmethod
+    def _is_multipart(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"content-type":
+                return value.lower().startswith(b"multipart/")
+        return False
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        detail = f"File is larger than {UPLOAD_MAX_BYTES // (1024 * 1024)} MB"
+        await JSONResponse({"detail": detail}, status_code=413, headers={"Connection": "close"})(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not UPLOAD_MAX_BYTES or not self._is_multipart(scope):
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_body:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        rejected = False
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    rejected = True
+                    if not started:
+                        await self._reject(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # The form parser fails on the cut-off body; the 413 has already been sent
+            if not rejected:
+                raise
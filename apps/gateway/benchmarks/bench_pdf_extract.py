@@ -0,0 +1,133 @@
+"""
+Serial pdfminer extraction vs. page-parallel extraction with early cut-off (app/utils/text_extract.py).
+
+Uses the PDFs in data/samples; when there are none, synthetic multi-page text PDFs are generated
+into a temp directory. Run from apps/gateway:
+
+    python -m benchmarks.bench_pdf_extract --workers 4 --pages 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.utils import text_extract as te
+
+
+SAMPLES = Path(__file__).resolve().parents[3] / "data" / "samples"
+WORDS = (
+    "experience python sql linux docker kubernetes datacenter servers maintenance monitoring network "
+    "hardware replacement documentation incidents tickets automation reporting inventory racks cabling "
+    "power cooling english responsibility teamwork requirements education university project"
+).split()
+
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: int, lines: int = 45, seed: int = 0) -> bytes:
+    """Minimal multi-page PDF with Helvetica text lines (enough layout work for pdfminer)."""
+    rng = random.Random(seed)
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        body = ["BT", "/F1 10 Tf", "12 TL", "40 790 Td"]
+        for _ in range(lines):
+            line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12)))
+            body.append(f"({_pdf_escape(line)}) Tj T*")
+        body.append("ET")
+        stream = "\n".join(body).encode("latin-1")
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        content_id = len(objs)
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        kids.append(len(objs))
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objs, start=1):
+        offsets.append(len(out))
+        data = obj if isinstance(obj, bytes) else obj.encode("latin-1")
+        out += f"{i} 0 obj\n".encode() + data + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def sample_pdfs(pages: int, count: int, tmp: Path) -> list[Path]:
+    found = sorted(SAMPLES.glob("*.pdf"))
+    if found:
+        return found
+    print(f"no PDFs in {SAMPLES}, generating {count} synthetic {pages}-page documents")
+    paths = []
+    for i in range(count):
+        p = tmp / f"sample-{i}.pdf"
+        p.write_bytes(make_pdf(pages, seed=i))
+        paths.append(p)
+    return paths
+
+
+async def _parallel(path: Path, page_budget: int, char_budget: int, chunk: int) -> tuple[float, float, int]:
+    t0 = time.perf_counter()
+    first = None
+    chars = 0
+    async for text in te.stream_pdf_pages(path, page_budget=page_budget, char_budget=char_budget, chunk_pages=chunk):
+        if first is None:
+            first = time.perf_counter() - t0
+        chars += len(text)
+    return time.perf_counter() - t0, first or 0.0, chars
+
+
+async def run(paths: list[Path], args) -> None:
+    te.EXTRACT_WORKERS = args.workers
+    te.EXTRACT_CPU_SECONDS = 0
+    te.EXTRACT_TIMEOUT = 600
+    # Warm the pool so process start-up is not billed to the first document
+    await te._in_pool(te._get_pool(), asyncio.get_running_loop().time() + 60, te.pdf_page_count, str(paths[0]))
+
+    rows = []
+    for path in paths:
+        t0 = time.perf_counter()
+        serial = te.extract_text_from_pdf(str(path), te.EXTRACT_MAX_PAGES)
+        t_serial = time.perf_counter() - t0
+        t_full, first_full, chars_full = await _parallel(path, 0, 0, args.chunk)
+        t_cut, first_cut, chars_cut = await _parallel(path, args.page_budget, args.char_budget, args.chunk)
+        rows.append((t_serial, len(serial), t_full, first_full, chars_full, t_cut, first_cut, chars_cut))
+        print(
+            f"{path.name:24s} serial {t_serial:6.2f}s ({len(serial)} ch) | parallel {t_full:6.2f}s, first page {first_full:5.2f}s "
+            f"({chars_full} ch) | cut-off {t_cut:6.2f}s ({chars_cut} ch)"
+        )
+    te.shutdown_extract_pool()
+
+    med = lambda i: statistics.median(r[i] for r in rows)  # noqa: E731
+    print(f"\nmedian over {len(rows)} documents, {args.workers} workers, {args.chunk} pages per range")
+    print(f"  serial                 {med(0):6.2f}s")
+    print(f"  parallel (all pages)   {med(2):6.2f}s  x{med(0) / max(med(2), 1e-9):.1f}, first page after {med(3):.2f}s")
+    print(f"  parallel + cut-off     {med(5):6.2f}s  x{med(0) / max(med(5), 1e-9):.1f} (budget {args.page_budget} pages / {args.char_budget} chars)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--chunk", type=int, default=2, help="pages per worker task")
+    ap.add_argument("--pages", type=int, default=30, help="pages per synthetic document")
+    ap.add_argument("--docs", type=int, default=3, help="synthetic documents to generate")
+    ap.add_argument("--page-budget", type=int, default=te.EXTRACT_PAGE_BUDGET)
+    ap.add_argument("--char-budget", type=int, default=te.EXTRACT_CHAR_BUDGET)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = sample_pdfs(args.pages, args.docs, Path(tmp))
+        asyncio.run(run(paths, args))
+
+
+if __name__ == "__main__":
+    main()
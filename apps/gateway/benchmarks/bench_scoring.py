@@ -0,0 +1,71 @@
+"""
+Throughput of the vectorized fallback scorer vs. the per-pair PolzaClient fallback.
+
+Run from apps/gateway:  python -m benchmarks.bench_scoring --profiles 20000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from app.integrations.polza import PolzaClient
+from app.scoring import rank_shortlist, score_applicants
+
+
+SKILLS = [
+    "python", "sql", "linux", "docker", "kubernetes", "excel", "word", "lan", "san", "raid",
+    "bios", "cmdb", "dcim", "git", "bash", "ansible", "terraform", "postgresql", "kafka", "spark",
+    "airflow", "java", "go", "react", "typescript", "грамотная речь", "английский", "1с", "itil", "jira",
+]
+WORDS = (
+    "обслуживание серверного оборудования монтаж диагностика замена комплектующих ведение документации "
+    "работа с заявками мониторинг инфраструктуры настройка сети взаимодействие с подрядчиками опыт "
+    "администрирование автоматизация отчётность инвентаризация дата центр стойки кабели питание охлаждение"
+).split()
+
+
+def _text(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def make_data(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    vacancy = {"skills": rng.sample(SKILLS, 10), "description": _text(rng, 120)}
+    profiles = [{"skills": rng.sample(SKILLS, rng.randint(3, 15)), "summary": _text(rng, rng.randint(20, 80))} for _ in range(n)]
+    return vacancy, profiles
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--profiles", type=int, default=10000)
+    ap.add_argument("--top-k", type=int, default=50)
+    args = ap.parse_args()
+
+    vacancy, profiles = make_data(args.profiles)
+
+    t0 = time.perf_counter()
+    looped = [PolzaClient.assess_application_fallback(vacancy, p)["match_score"] for p in profiles]
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vectorized = [round(float(s), 2) for s in score_applicants(vacancy, profiles)]
+    t_vec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    shortlist = rank_shortlist(vacancy, list(enumerate(profiles)), top_k=args.top_k)
+    t_rank = time.perf_counter() - t0
+
+    mismatches = sum(1 for a, b in zip(looped, vectorized) if a != b)
+    n = len(profiles)
+    print(f"profiles: {n}")
+    print(f"per-pair fallback : {t_loop:8.3f}s  {n / t_loop:12.0f} profiles/s")
+    print(f"vectorized scores : {t_vec:8.3f}s  {n / t_vec:12.0f} profiles/s  ({t_loop / t_vec:.1f}x)")
+    print(f"rank_shortlist    : {t_rank:8.3f}s  top-{args.top_k}, best={shortlist[0]['match_score'] if shortlist else '-'}")
+    print(f"score mismatches  : {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+With the LLM unreachable, assessments must not be stored as LLM results (and so must never auto-invite).
+
+Points the Polza client at a closed local port, seeds one vacancy with applicants the heuristic would accept
+above INVITE_THRESHOLD, then runs a vacancy re-assessment and the assessment queue. Checks that the run reports
+every application as failed with nothing assessed or invited, and that a queue job keeps retrying until its last
+attempt, which stores the heuristic score as assessed_by="fallback" without an invite. Exits with status 1 on a
+failed check. Run from apps/gateway (a throwaway sqlite database by default):
+
+    python -m benchmarks.check_llm_down
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+
+def _configure() -> None:
+    # Before any app import: settings are read at import time
+    if "DB_URL" not in os.environ:
+        os.environ["DB_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='llm-down-')}/llm_down.db"
+    os.environ.update(
+        # Nothing listens on the discard port: every completion fails with a connection error
+        POLZA_API_KEY="llm-down-check", POLZA_API_BASE="http://127.0.0.1:9/v1", POLZA_MAX_RETRIES="0",
+        ASSESS_WORKERS="0", ASSESS_MAX_ATTEMPTS="2", ASSESS_BACKOFF_BASE="0", LLM_CACHE_ENABLED="0",
+        METRICS_ENABLED="0", TRACING_ENABLED="0", QUERY_DEBUG="0",
+    )
+    os.environ.setdefault("JWT_SECRET", "llm-down-" + "0" * 32)
+
+
+async def _run(applicants: int) -> list[str]:
+    from app.db import SessionLocal, init_db
+    from app.integrations.polza import PolzaClient, close_polza, open_polza
+    from app.jobs import claim_next_job, enqueue_assessment, process_job, run_reassess, start_reassess_run, vacancy_payload
+    from app.config import INVITE_THRESHOLD
+    from app.models import Application, AssessmentJob, ReassessRun, User, Vacancy
+
+    init_db()
+    await open_polza()
+    problems: list[str] = []
+    skills = ["python", "sql", "fastapi", "postgresql"]
+    profile = {"summary": "Python developer: SQL, FastAPI, PostgreSQL", "skills": skills}
+    with SessionLocal() as db:
+        hr = User(email=f"hr-{os.getpid()}@example.com", name="HR", role="hr", password_hash="-")
+        db.add(hr)
+        db.flush()
+        vac = Vacancy(title="Backend", description="Python, SQL, FastAPI, PostgreSQL", seniority="Middle",
+                      skills=skills, weights={}, status="approved", details={}, owner_id=hr.id)
+        db.add(vac)
+        db.flush()
+        cands = [User(email=f"c-{os.getpid()}-{i}@example.com", name=f"C{i}", role="candidate", password_hash="-") for i in range(applicants)]
+        db.add_all(cands)
+        db.flush()
+        apps = [Application(vacancy_id=vac.id, candidate_id=c.id, status="applied", profile_snapshot=profile) for c in cands]
+        db.add_all(apps)
+        db.commit()
+        vac_id, hr_id, app_ids = vac.id, hr.id, [a.id for a in apps]
+        heuristic = PolzaClient.assess_application_fallback(vacancy_payload(vac), profile)
+    if not (heuristic["verdict"] == "accept" and float(heuristic["match_score"]) >= INVITE_THRESHOLD):
+        problems.append(f"setup: the heuristic would not invite these applicants ({heuristic}), the check proves nothing")
+
+    # --- vacancy re-assessment ---
+    with SessionLocal() as db:
+        run = start_reassess_run(db, vac_id, hr_id, concurrency=4)
+        db.commit()
+        run_id = run.id
+    await run_reassess(run_id, vac_id, 4, batch_size=max(2, applicants // 2))
+    with SessionLocal() as db:
+        run = db.get(ReassessRun, run_id)
+        statuses = [db.get(Application, aid).status for aid in app_ids]
+        print(f"reassess run: status={run.status} total={run.total} done={run.done} failed={run.failed}")
+        if run.failed != applicants or run.done != 0:
+            problems.append(f"reassess: expected failed={applicants} done=0, got failed={run.failed} done={run.done}")
+        if any(s != "applied" for s in statuses):
+            problems.append(f"reassess: applications changed without an LLM result: {statuses}")
+
+    # --- assessment queue: retried, then the heuristic on the last attempt ---
+    with SessionLocal() as db:
+        job_id = enqueue_assessment(db, app_ids[0]).id if db.flush() is None else None
+        db.commit()
+        job_id = db.query(AssessmentJob.id).filter(AssessmentJob.application_id == app_ids[0]).scalar()
+    while (claimed := claim_next_job()) is not None:
+        await process_job(claimed)
+    with SessionLocal() as db:
+        job, app = db.get(AssessmentJob, job_id), db.get(Application, app_ids[0])
+        print(f"queue job: status={job.status} attempts={job.attempts} -> application status={app.status} assessed_by={app.assessed_by}")
+        if job.attempts != job.max_attempts:
+            problems.append(f"queue: expected {job.max_attempts} attempts, got {job.attempts}")
+        if app.assessed_by != "fallback" or app.status == "invited":
+            problems.append(f"queue: expected a non-invited fallback score, got status={app.status} assessed_by={app.assessed_by}")
+
+    await close_polza()
+    return problems
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.check_llm_down")
+    ap.add_argument("--applicants", type=int, default=6)
+    args = ap.parse_args()
+    _configure()
+    problems = asyncio.run(_run(args.applicants))
+    for p in problems:
+        print("FAIL " + p)
+    print("ok" if not problems else f"{len(problems)} check(s) failed")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,14 @@ async function tryRefresh(): Promise<void> {
   }
 }
 
-export async function api<T>(path: string, options: { method?: HttpMethod; body?: any; headers?: Record<string, string> } = {}): Promise<T> {
+type ApiOptions = { method?: HttpMethod; body?: any; headers?: Record<string, string> }
+
+export async function api<T>(path: string, options: ApiOptions = {}): Promise<T> {
+  return (await apiWithHeaders<T>(path, options)).data
+}
+
+// Same as api(), also returning the response headers (pagination cursor etc.)
+export async function apiWithHeaders<T>(path: string, options: ApiOptions = {}): Promise<{ data: T; headers: Headers }> {
   // Notify global listeners that a request began
   try { window.dispatchEvent(new CustomEvent('apiload', { detail: { delta: +1, path, method: options.method || 'GET' } })) } catch {}
   const headers: Record<string, string> = {
@@ -66,16 +73,30 @@ export async function api<T>(path: string, options: { method?: HttpMethod; body?
   }
   if (res.status === 204) {
     try { window.dispatchEvent(new CustomEvent('apiload', { detail: { delta: -1, path, method: options.method || 'GET' } })) } catch {}
-    return undefined as unknown as T
+    return { data: undefined as unknown as T, headers: res.headers }
   }
   const ct = res.headers.get('content-type') || ''
   if (!ct.includes('application/json')) {
     try { window.dispatchEvent(new CustomEvent('apiload', { detail: { delta: -1, path, method: options.method || 'GET' } })) } catch {}
-    return undefined as unknown as T
+    return { data: undefined as unknown as T, headers: res.headers }
   }
   const data = await res.json() as T
   try { window.dispatchEvent(new CustomEvent('apiload', { detail: { delta: -1, path, method: options.method || 'GET' } })) } catch {}
-  return data
+  return { data, headers: res.headers }
+}
+
+// List endpoints return one page at a time; follow X-Next-Cursor until the last page
+export async function apiAll<T>(path: string): Promise<T[]> {
+  const items: T[] = []
+  let cursor: string | null = null
+  do {
+    const sep = path.includes('?') ? '&' : '?'
+    const url = cursor ? `${path}${sep}cursor=${encodeURIComponent(cursor)}` : path
+    const { data, headers } = await apiWithHeaders<T[]>(url)
+    items.push(...(data || []))
+    cursor = headers.get('X-Next-Cursor')
+  } while (cursor)
+  return items
 }
 
 export type Tokens = { access_token: string; refresh_token: string; token_type: string }
@@ -1,4 +1,4 @@
-import { api } from '@/api/client'
+import { api, apiAll } from '@/api/client'
 
 export type Vacancy = {
   id: number
@@ -25,8 +25,8 @@ export type VacancyCreate = {
 
 export type VacancyUpdate = Partial<VacancyCreate>
 
-export const listVacancies = () => api<Vacancy[]>('/vacancies')
-export const listPublicVacancies = () => api<Vacancy[]>('/vacancies/public')
+export const listVacancies = () => apiAll<Vacancy>('/vacancies')
+export const listPublicVacancies = () => apiAll<Vacancy>('/vacancies/public')
 export const createVacancy = (payload: VacancyCreate) => api<Vacancy>('/vacancies', { method: 'POST', body: payload })
 export const updateVacancy = (id: number, payload: VacancyUpdate) => api<Vacancy>(`/vacancies/${id}`, { method: 'PATCH', body: payload })
 
@@ -58,7 +58,7 @@ export const archiveVacancy = (id: number) => api<Vacancy>(`/vacancies/${id}/arc
 export const unarchiveVacancy = (id: number) => api<Vacancy>(`/vacancies/${id}/unarchive`, { method: 'POST' })
 export const revokeVacancy = (id: number) => api<Vacancy>(`/vacancies/${id}/revoke`, { method: 'POST' })
 export type User = { id: number; email: string; name: string; role: string; created_at: string }
-export const listUsers = (role?: string) => api<User[]>(`/auth/users${role ? `?role=${encodeURIComponent(role)}` : ''}`)
+export const listUsers = (role?: string) => apiAll<User>(`/auth/users${role ? `?role=${encodeURIComponent(role)}` : ''}`)
 export const generateVacancy = (payload: { title?: string; seniority?: string; highlights?: string[]; details?: Record<string, any> }) => api<Vacancy>('/vacancies/generate', { method: 'POST', body: payload })
 
 // Profiles (candidate)
@@ -86,7 +86,9 @@ export type Application = {
   created_at: string
 }
 export const applyToVacancy = (vacancy_id: number) => api<Application>('/applications', { method: 'POST', body: { vacancy_id } })
-export const listMyApplications = () => api<Application[]>('/applications/me')
-export const listHrApplications = () => api<Application[]>('/applications/hr')
+export const listMyApplications = () => apiAll<Application>('/applications/me')
+export const listHrApplications = () => apiAll<Application>('/applications/hr')
+export type HrFeedItem = Application & { vacancy_title: string; vacancy_status: string; candidate_name: string; candidate_email: string }
+export const listHrFeed = () => apiAll<HrFeedItem>('/applications/hr/feed')
 export const updateApplication = (id: number, body: Partial<Pick<Application,'status'|'match_score'|'verdict'|'notes'>>) => api<Application>(`/applications/${id}`, { method: 'PATCH', body })
 export const reassessApplication = (id: number) => api<Application>(`/applications/${id}/assess`, { method: 'POST' })
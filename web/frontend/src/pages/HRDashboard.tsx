@@ -3,7 +3,7 @@ import { Button } from '@/components/ui/button'
 import { Input } from '@/components/ui/input'
 import { Textarea } from '@/components/ui/textarea'
 import { useAuth } from '@/context/AuthContext'
-import { approveVacancy, listVacancies, updateVacancy, uploadVacancyFile, deleteVacancy, archiveVacancy, unarchiveVacancy, revokeVacancy, generateVacancy, type Vacancy, listHrApplications, type Application, reassessApplication } from '@/api/vacancies'
+import { approveVacancy, listVacancies, updateVacancy, uploadVacancyFile, deleteVacancy, archiveVacancy, unarchiveVacancy, revokeVacancy, generateVacancy, type Vacancy, listHrFeed, type Application, type HrFeedItem, reassessApplication } from '@/api/vacancies'
 import { toast } from 'sonner'
 import { ConfirmDialog } from '@/components/ui/confirm-dialog'
 
@@ -33,9 +33,9 @@ export default function HRDashboard() {
   useEffect(() => {
     refresh()
   }, [])
-  const [apps, setApps] = useState<Application[]>([])
+  const [apps, setApps] = useState<HrFeedItem[]>([])
   async function refreshApps() {
-    try { setApps(await listHrApplications()) } catch {}
+    try { setApps(await listHrFeed()) } catch {}
   }
   useEffect(()=>{ refreshApps() }, [])
   // Auto-poll HR applications so оценка/новые отклики видны сразу
@@ -236,7 +236,7 @@ export default function HRDashboard() {
         </div>
         <div className="grid gap-3">
           {apps.map(a => (
-            <ApplicationRow key={a.id} app={a} onUpdated={(na)=> setApps(apps.map(x=> x.id===na.id? na: x))} />
+            <ApplicationRow key={a.id} app={a} onUpdated={(na)=> setApps(apps.map(x=> x.id===na.id? { ...x, ...na }: x))} />
           ))}
           {!apps.length && <div className="text-sm text-muted-foreground">Пока нет откликов</div>}
         </div>
@@ -391,13 +391,13 @@ function pruneEmpty(obj: Record<string, any>) {
   return out
 }
 
-function ApplicationRow({ app, onUpdated }: { app: Application; onUpdated: (a: Application)=>void }) {
+function ApplicationRow({ app, onUpdated }: { app: HrFeedItem; onUpdated: (a: Application)=>void }) {
   const [loading, setLoading] = useState(false)
   return (
     <div className="rounded-lg border p-3">
       <div className="flex items-center justify-between">
         <div className="text-sm">
-          <div className="font-medium">Вакансия #{app.vacancy_id}</div>
+          <div className="font-medium">{app.vacancy_title} · {app.candidate_name} <span className="text-xs text-muted-foreground">{app.candidate_email}</span></div>
           <div className="text-xs text-muted-foreground">Статус: {app.status} {app.match_score!=null? `· Оценка: ${app.match_score}`:''} {app.verdict? `· Решение: ${app.verdict}`:''} {app.status==='invited' ? '· Допуск: да' : '· Допуск: нет'}</div>
         </div>
         <div className="flex items-center gap-2">